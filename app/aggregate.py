@@ -0,0 +1,86 @@
+import math
+import threading
+import time
+
+STATS = ("mean", "min", "max", "last", "count", "std")
+
+class WindowStats:
+    """Running stats of one (device, measurement) window, Welford updates so memory does not grow with samples."""
+    __slots__ = ("start", "count", "mean", "m2", "min", "max", "last", "unit", "metadata", "updated")
+
+    def __init__(self, start, unit, metadata):
+        self.start = start  # window start, ns since epoch
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+        self.unit = unit
+        self.metadata = metadata  # latest metadata template of the device
+        self.updated = time.monotonic()  # when the last sample was added
+
+    def add(self, value):
+        self.updated = time.monotonic()
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    def summary(self):
+        """Returns (stat, value) pairs in STATS order."""
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return zip(STATS, (self.mean, self.min, self.max, self.last, self.count, std))
+
+class Aggregator:
+    """
+    Tumbling windows of `window` seconds per (device, measurement name), aligned on the sample timestamps.
+    A window is closed when a sample of a later window arrives for the same key, or by expire() when
+    no sample was added to it for two windows, for devices that stopped sending.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.window_ns = int(window * 1_000_000_000)
+        self.windows = {}  # (device, name) -> WindowStats
+        self.next_expire = 0  # expire() scans the windows at most once per window
+        self.lock = threading.Lock()  # pipeline workers share the aggregator
+
+    def add(self, device, name, value, timestamp, unit, metadata):
+        """Adds a sample, returns the [(device, name, WindowStats)] it closed. NaN samples are ignored."""
+        start = timestamp - timestamp % self.window_ns
+        key = (device, name)
+        closed = []
+        if value != value:
+            return closed
+        with self.lock:
+            stats = self.windows.get(key)
+            if stats is None or stats.start != start:
+                if stats is not None:
+                    if start < stats.start:  # late sample of a window already published
+                        return closed
+                    closed.append((device, name, stats))
+                stats = self.windows[key] = WindowStats(start, unit, metadata)
+            stats.metadata = metadata
+            stats.add(value)
+        return closed
+
+    def expire(self):
+        """Closes windows without new samples for two windows."""
+        now = time.monotonic()
+        with self.lock:
+            if now < self.next_expire:
+                return []
+            self.next_expire = now + self.window
+            keys = [key for key, stats in self.windows.items() if now - stats.updated >= 2 * self.window]
+            return [(*key, self.windows.pop(key)) for key in keys]
+
+    def drain(self):
+        """Closes every window, including the current ones."""
+        with self.lock:
+            closed = [(*key, stats) for key, stats in self.windows.items()]
+            self.windows.clear()
+        return closed
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import signal
+import threading
+import time
+import paho.mqtt.client as mqtt
+from client import My_Client
+from pipeline import Message
+
+class AsyncioHelper:
+    """
+    Drives a paho client from an asyncio event loop instead of loop_forever():
+    socket reads/writes are registered with the loop and loop_misc() runs as a task.
+    """
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        self.misc = None
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        self.misc = self.loop.create_task(self.misc_loop())
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self.misc is not None:
+            self.misc.cancel()
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def misc_loop(self):
+        # keepalives and retries, what loop_forever() does between reads
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                break
+
+class AsyncPipeline:
+    """
+    asyncio counterpart of pipeline.Pipeline. Messages are decoded in receive order on the event loop,
+    then up to `concurrency` Beehive flushes are awaited at the same time in the default executor.
+    """
+
+    def __init__(self, handler, flush, concurrency=4, max_queue=1000):
+        self.handler = handler
+        self.flush = flush
+        self.concurrency = concurrency
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.tasks = []
+        self.dropped = 0  # messages dropped because the queue was full
+        self.handled_count = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.consumer()) for _ in range(self.concurrency)]
+        logging.info(f"[PIPELINE] started {len(self.tasks)} asyncio consumer(s)")
+
+    async def stop(self, timeout=10):
+        # let the consumers handle what is already queued, as Pipeline.stop does, then cancel them
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            remaining = self.queue.qsize()
+            self.dropped += remaining
+            logging.warning(f"[PIPELINE] stopped with {remaining} message(s) not handled after {timeout}s")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, topic, payload):
+        """Queue a received message, returns False if it had to be dropped."""
+        try:
+            self.queue.put_nowait(Message(topic, payload, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logging.warning(f"[PIPELINE] queue full, dropped {self.dropped} message(s) so far")
+            return False
+        return True
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def handled(self):
+        return self.handled_count
+
+    async def consumer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await self.queue.get()
+            self.handled_count += 1
+            try:
+                self.handler(message)
+                # publishing blocks on the network, keep it off the event loop
+                await loop.run_in_executor(None, self.flush)
+            except Exception as e:
+                logging.error(f"[PIPELINE] Failed to handle message from {message.topic}: {e}")
+            finally:
+                self.queue.task_done()
+
+class My_Async_Client(My_Client):
+    """
+    Runs the MQTT subscription in an asyncio event loop. Filtering and signal indicators
+    behave as in My_Client, only the scheduling of decode and publish differs.
+    """
+
+    def __init__(self, args):
+        super().__init__(args)
+        self.pipeline = AsyncPipeline(self.handle_message, self.flush_publisher,
+                                      concurrency=self.args.publish_concurrency, max_queue=self.args.worker_queue_size)
+        self.client.on_disconnect = self.on_disconnect
+        self.disconnected = None
+        self.stopping = False
+        self.reconnect_delay = 5
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.reconnect_delay = 5
+        super().on_connect(client, userdata, flags, rc)
+
+    def on_disconnect(self, client, userdata, rc):
+        logging.warning(f"[MQTT CLIENT] Disconnected from MQTT broker with code {rc}")
+        self.disconnected.set()
+
+    def stop(self):
+        # runs on the event loop, paho's socket is only used from there
+        logging.info("[MQTT CLIENT] stopping...")
+        self.stopping = True
+        self.client.disconnect()
+        self.disconnected.set()
+
+    def flush(self):
+        # publish_message leaves queued measurements to the consumer, which awaits flush_publisher
+        return
+
+    def flush_publisher(self):
+        with self.perf.stage("publish"):
+            self.publisher.flush()
+
+    def run(self):
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        loop = asyncio.get_running_loop()
+        AsyncioHelper(loop, self.client)
+        self.disconnected = asyncio.Event()
+        if threading.current_thread() is threading.main_thread(): # container stop, cron relaunch or supervisor
+            loop.add_signal_handler(signal.SIGTERM, self.stop)
+        self.pipeline.start()
+        with self.publisher:
+            try:
+                logging.info(f"[MQTT CLIENT] connecting [{self.args.mqtt_server_ip}:{self.args.mqtt_server_port}]...")
+                self.client.connect(host=self.args.mqtt_server_ip, port=self.args.mqtt_server_port, bind_address="0.0.0.0")
+                logging.info("[MQTT CLIENT] waiting for callback...")
+                while True:
+                    await self.disconnected.wait()
+                    self.disconnected.clear()
+                    if self.stopping:
+                        break
+                    # same backoff as reconnect_delay_set in configure_client
+                    await asyncio.sleep(self.reconnect_delay)
+                    self.reconnect_delay = min(self.reconnect_delay * 2, 60)
+                    logging.info("[MQTT CLIENT] reconnecting...")
+                    try:
+                        self.client.reconnect()
+                    except OSError as e:
+                        logging.error(f"[MQTT CLIENT] Reconnect failed: {e}")
+                        self.disconnected.set()
+            finally:
+                await self.pipeline.stop()
+                self.close()
@@ -0,0 +1,135 @@
+import argparse
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import partial
+
+# One fixed-width record per parameter: ts_ns int64, device_id uint8, code uint8, value float32, status uint8
+RECORD = struct.Struct('<qBBfB')
+RECORD_FIELDS = [('ts_ns', '<i8'), ('device_id', 'u1'), ('code', 'u1'), ('value', '<f4'), ('status', 'u1')]
+SUFFIX = '.rec'
+NS_PER_DAY = 86400 * 1_000_000_000
+
+def day_of(ts_ns):
+    return datetime.fromtimestamp(ts_ns // 1_000_000_000, timezone.utc).strftime('%Y-%m-%d')
+
+class Archive:
+    """
+    Append-only local store of decoded records, one file per day (UTC) and device:
+        <directory>/<YYYY-MM-DD>/<devEui>.rec
+    Files are packed RECORD structs, 15 bytes per parameter, so they can be memory-mapped
+    as numpy structured arrays. Every packet is written with a single append.
+    """
+
+    def __init__(self, directory, max_open=64):
+        self.directory = directory
+        self.max_open = max_open
+        self.files = OrderedDict()  # (day, device) -> open file, least recently written first
+        self.lock = threading.Lock()  # pipeline workers share the archive
+        self.records = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def sink(self, device):
+        """Returns the callable Decoder.decode_ns(sink=...) writes a packet of `device` with."""
+        return partial(self.append, device)
+
+    def append(self, device, timestamp, device_id, records):
+        data = b''.join(RECORD.pack(timestamp, device_id, param.code, float('nan') if value is None else value, status)
+                        for param, value, status in records)
+        with self.lock:
+            try:
+                self.file(day_of(timestamp), device).write(data)
+            except OSError as e:
+                logging.error(f"[ARCHIVE] Failed to write records of {device}: {e}")
+                return
+            self.records += len(records)
+
+    def file(self, day, device):
+        key = (day, device)
+        f = self.files.get(key)
+        if f is not None:
+            self.files.move_to_end(key)
+            return f
+        os.makedirs(os.path.join(self.directory, day), exist_ok=True)
+        f = self.files[key] = open(os.path.join(self.directory, day, device + SUFFIX), 'ab', buffering=0)
+        if len(self.files) > self.max_open:
+            self.files.popitem(last=False)[1].close()
+        return f
+
+    def close(self):
+        with self.lock:
+            for f in self.files.values():
+                f.close()
+            self.files.clear()
+
+    def partitions(self, start_ns=None, end_ns=None, devices=None):
+        """Yields (day, device, path) of the files that may hold records in [start_ns, end_ns)."""
+        first = day_of(start_ns) if start_ns is not None else None
+        last = day_of(end_ns - 1) if end_ns is not None else None
+        devices = {device.lower() for device in devices} if devices is not None else None
+        for day in sorted(os.listdir(self.directory)):
+            if (first and day < first) or (last and day > last):
+                continue
+            day_dir = os.path.join(self.directory, day)
+            if not os.path.isdir(day_dir):
+                continue
+            for name in sorted(os.listdir(day_dir)):
+                device = name[:-len(SUFFIX)]
+                if name.endswith(SUFFIX) and (devices is None or device in devices):
+                    yield day, device, os.path.join(day_dir, name)
+
+    @staticmethod
+    def load(path):
+        """Memory-maps a partition file, a record cut short by a crash at the end is ignored."""
+        import numpy as np
+        dtype = np.dtype(RECORD_FIELDS)
+        count = os.path.getsize(path) // dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def query(self, start_ns=None, end_ns=None, codes=None, devices=None):
+        """
+        Records with start_ns <= ts_ns < end_ns, optionally only some parameter codes and devices.
+        Returns {device: structured array of RECORD_FIELDS}, in write order.
+        """
+        import numpy as np
+        parts = {}
+        for day, device, path in self.partitions(start_ns, end_ns, devices):
+            records = self.load(path)
+            mask = np.ones(len(records), dtype=bool)
+            if start_ns is not None:
+                mask &= records['ts_ns'] >= start_ns
+            if end_ns is not None:
+                mask &= records['ts_ns'] < end_ns
+            if codes is not None:
+                mask &= np.isin(records['code'], list(codes))
+            parts.setdefault(device, []).append(records[mask])
+        # one copy per device, the files are unmapped afterwards
+        return {device: np.concatenate(arrays) for device, arrays in parts.items() if sum(map(len, arrays))}
+
+def parse_day(value):
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+def main():
+    # Offline query of an archive directory, prints CSV
+    parser = argparse.ArgumentParser(description="Query the local archive written with --archive-dir")
+    parser.add_argument("directory", help="archive directory")
+    parser.add_argument("--since", type=parse_day, default=None, help="first day (YYYY-MM-DD, UTC)")
+    parser.add_argument("--until", type=parse_day, default=None, help="last day (YYYY-MM-DD, UTC), included")
+    parser.add_argument("--code", type=int, nargs="*", default=None, help="parameter codes (see parameters.csv)")
+    parser.add_argument("--device", nargs="*", default=None, help="devEuis")
+    args = parser.parse_args()
+
+    end_ns = args.until + NS_PER_DAY if args.until is not None else None
+    archive = Archive(args.directory)
+    print("device,ts_ns,device_id,code,value,status")
+    for device, records in archive.query(args.since, end_ns, args.code, args.device).items():
+        for record in records.tolist():
+            print(device + "," + ",".join(str(field) for field in record))
+
+if __name__ == "__main__":
+    main()
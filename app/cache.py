@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Bounded mapping whose entries expire `ttl` seconds after they were last set.
+    Entries are kept oldest first, so expiry and size eviction only look at the front.
+    """
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (expiry time, value)
+        self.lock = threading.Lock()  # shared by pipeline workers
+
+    def __len__(self):
+        return len(self.entries)
+
+    def expire(self, now):
+        while self.entries:
+            key, (expiry, _) = next(iter(self.entries.items()))
+            if expiry > now and len(self.entries) <= self.max_size:
+                break
+            self.entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                return default
+            return entry[1]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self.lock:
+            self.entries[key] = (now + self.ttl, value)
+            self.entries.move_to_end(key)
+            self.expire(now)
+
+    def add(self, key):
+        """Add key, returns False if it was already present and has not expired."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self.entries[key] = (now + self.ttl, None)
+            self.entries.move_to_end(key)
+            self.expire(now)
+            return True
@@ -1,51 +1,161 @@
+import json
+import logging
+import os
+import threading
 import time
+from collections import OrderedDict
+
+WINDOW = 64  # number of recent fCnts remembered per device to detect duplicates and late arrivals
+WINDOW_MASK = (1 << WINDOW) - 1
+MAX_FCNT_GAP = 16384  # larger jumps are treated as a device reset/resync rather than loss (LoRaWAN MAX_FCNT_GAP)
+FCNT_SIZES = (1 << 16, 1 << 32)  # 16 and 32 bit frame counters
+STATE_VERSION = 1  # format of the saved state file
+
+class DeviceState:
+    __slots__ = ("fCnt", "window", "totalpl", "pckcount", "late", "last_calculation_time")
+
+    def __init__(self, fCnt, now):
+        self.fCnt = fCnt  # Last (highest) frame count, None after a join
+        self.window = 1  # bit i set when fCnt - i was received
+        self.totalpl = 0  # Total packet loss
+        self.pckcount = 0  # Total packets received
+        self.late = 0  # Packets that arrived after a newer one, already counted as lost
+        self.last_calculation_time = now  # Last PLR calculation time
 
 class PacketLossCalculator:
-    def __init__(self, plr_sec: int):
-        self.devices = {}  # Dictionary to track each device's data
+    def __init__(self, plr_sec: int, max_devices: int = 10000):
+        self.devices = OrderedDict()  # devEui -> DeviceState, least recently seen first
         self.plr_sec = plr_sec  # Time interval for PLR calculation in seconds
+        self.max_devices = max_devices  # bound memory, least recently seen devices are forgotten
+        self.changed = False  # packets processed since the state was last saved
+        self.save_lock = threading.Lock()  # one pipeline worker saves at a time
 
     def process_packet(self, deveui, fCnt):
         """Process a packet from a specific device and calculate packet loss and PLR."""
-        # Initialize device data if not already present
-        if deveui not in self.devices:
-            self.devices[deveui] = {
-                "fCnt": 0,  # Last frame count
-                "totalpl": 0,  # Total packet loss
-                "pckcount": 0,  # Total packets received
-                "last_calculation_time": time.time()  # Last PLR calculation time
-            }
-
-        # Reference device data
-        device = self.devices[deveui]
-
-        # Initialize fCnt if not already set
-        if fCnt and device["fCnt"] == 0:
-            device["fCnt"] = fCnt
-
-        # Calculate packet loss for this packet
-        pl = 0
-        if fCnt > device["fCnt"]:
-            pl = (fCnt - device["fCnt"] - 1)
-            device["totalpl"] += pl
+        now = time.time()
+        device = self.devices.get(deveui)
 
-        # Update the last received fCnt
-        device["fCnt"] = fCnt
+        pl = 0
+        # Initialize device data if not already present
+        if device is None:
+            device = self.devices[deveui] = DeviceState(fCnt or 0, now)
+            if len(self.devices) > self.max_devices:
+                self.devices.popitem(last=False)
+        else:
+            self.devices.move_to_end(deveui)
+            if fCnt is None:
+                diff = 0
+            elif device.fCnt is None:
+                diff = None  # first uplink after a join
+            else:
+                diff = self.fcnt_diff(device.fCnt, fCnt)
+            if diff is None:
+                # device reset, resync or rejoin, start counting again from this fCnt
+                device.fCnt = fCnt
+                device.window = 1
+            elif diff > 0:
+                # Calculate packet loss for this packet
+                pl = diff - 1
+                device.totalpl += pl
+                device.fCnt = fCnt
+                device.window = ((device.window << diff) | 1) & WINDOW_MASK
+            elif fCnt is not None:
+                bit = 1 << -diff
+                if device.window & bit:
+                    # duplicate, e.g. the same uplink received through another gateway
+                    return (0, None)
+                # late arrival: it was counted as lost when a newer fCnt arrived
+                device.window |= bit
+                device.late += 1
+                if device.totalpl > 0:
+                    device.totalpl -= 1
 
         # Increment packet count
-        device["pckcount"] += 1
+        device.pckcount += 1
+        self.changed = True
 
         # Calculate PLR for this device if the time interval has passed
-        current_time = time.time()
-        if current_time - device["last_calculation_time"] >= self.plr_sec:
-            total_packets = device["pckcount"] + device["totalpl"]
-            plr = (device["totalpl"] / total_packets * 100) if total_packets > 0 else 0
+        if now - device.last_calculation_time >= self.plr_sec:
+            total_packets = device.pckcount + device.totalpl
+            plr = (device.totalpl / total_packets * 100) if total_packets > 0 else 0
             plr = round(plr, 2)#Format PLR to two decimal places
 
             # Reset the counters for the next interval
-            device["totalpl"] = 0
-            device["pckcount"] = 0
-            device["last_calculation_time"] = current_time
+            device.totalpl = 0
+            device.pckcount = 0
+            device.last_calculation_time = now
 
             return (pl, plr)
         return (pl, None)
+
+    def reset(self, deveui):
+        """
+        Forget the frame counter of a device that (re)joined, its next uplink starts a new fCnt sequence
+        instead of being taken for a duplicate. Counters of the current PLR interval are kept.
+        """
+        device = self.devices.get(deveui)
+        if device is not None:
+            device.fCnt = None
+
+    def save(self, path):
+        """
+        Writes the per-device state to `path` if it changed since the last save. The file is replaced
+        atomically, so a crash leaves the previous state. Returns True if it was written.
+        """
+        if not self.changed or not self.save_lock.acquire(blocking=False):
+            return False
+        try:
+            self.changed = False
+            # list() copies the devices without running python code, so other workers can't change them mid-copy
+            devices = {deveui: [d.fCnt, d.window, d.totalpl, d.pckcount, d.late, d.last_calculation_time]
+                       for deveui, d in list(self.devices.items())}
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": STATE_VERSION, "devices": devices}, f, separators=(",", ":"))
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            self.changed = True
+            logging.error(f"[PLR] Could not save state to {path}: {e}")
+            return False
+        finally:
+            self.save_lock.release()
+
+    def load(self, path):
+        """Restores the per-device state saved by save(), least recently seen devices first. Returns the number of devices."""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("version") != STATE_VERSION:
+                raise ValueError(f"unknown version {state.get('version')}")
+            devices = OrderedDict()
+            for deveui, (fCnt, window, totalpl, pckcount, late, last_calculation_time) in state["devices"].items():
+                device = devices[deveui] = DeviceState(fCnt, last_calculation_time)
+                device.window, device.totalpl, device.pckcount, device.late = window, totalpl, pckcount, late
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.error(f"[PLR] Ignoring state in {path}: {e}")
+            return 0
+        while len(devices) > self.max_devices:
+            devices.popitem(last=False)
+        self.devices = devices
+        return len(devices)
+
+    @staticmethod
+    def fcnt_diff(last, fCnt):
+        """
+        Signed distance from the last fCnt to this one, taking 16/32 bit rollover into account.
+        Returns None when the jump is too large to be loss or reordering (device reset).
+        """
+        diff = fCnt - last
+        if 0 <= diff <= MAX_FCNT_GAP:
+            return diff
+        if -WINDOW < diff < 0:
+            return diff
+        for size in FCNT_SIZES:
+            if last < size and fCnt < size:
+                wrapped = (fCnt - last) % size
+                if 0 < wrapped <= MAX_FCNT_GAP:
+                    return wrapped
+        return None
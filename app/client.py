@@ -1,19 +1,50 @@
 import logging
 import os
 import base64
-from datetime import datetime
+import signal
+import threading
+import time
 import paho.mqtt.client as mqtt
-from waggle.plugin import Plugin
 from parse import *
 from calc import PacketLossCalculator
 from decoder import *
+from publisher import Publisher
+from spool import Spool
+from perf import PerfMonitor
+from pipeline import Pipeline, topic_route
+from cache import TTLCache
+from msglog import PacketLog
+from plan import PublishPlan
+from registry import DecoderRegistry
+from archive import Archive
+from packing import RawBatch, pack_rxinfo
+from aggregate import Aggregator
+from deadband import Deadband
 
 class My_Client:
     def __init__(self, args):
         self.args = args
         self.client = self.configure_client()
         self.plr_calc = PacketLossCalculator(self.args.plr)
-        self.decoder = Decoder()
+        self.plr_saved = time.monotonic() # when the packet loss state was last saved to --plr-state
+        self.restore_plr_state()
+        self.decoders = self.configure_decoders() # decoder per devEui/deviceProfileName, created on first packet
+        self.publisher = self.configure_publisher()
+        self.perf = PerfMonitor(self.args.perf_interval) # per-stage timing, disabled when interval is 0
+        self.pipeline = Pipeline(self.handle_message, workers=self.args.workers, max_queue=self.args.worker_queue_size)
+        self.dedup = TTLCache(self.args.dedup_ttl) if self.args.dedup_ttl > 0 else None # recently handled uplinks
+        self.dedup_suppressed = 0 # duplicate uplinks dropped
+        self.reported_counters = {} # counter values already published
+        self.dev_euis = {dev_eui.lower() for dev_eui in self.args.dev_eui}
+        self.event_counts = {} # non-uplink events received, by event type
+        self.event_handlers = {"join": self.on_join_event} # other events are counted and dropped
+        self.packet_log = PacketLog(self.args.log_interval) # one summary line per uplink, rate-limited per device
+        self.plans = {} # decoder -> PublishPlan of its lookup table
+        self.undecoded = 0 # uplinks dropped because no decoder is configured for the device
+        self.archive = Archive(self.args.archive_dir) if self.args.archive_dir else None # local copy of decoded records
+        self.aggregator = Aggregator(self.args.aggregate_window) if self.args.aggregate_window > 0 else None # window summaries instead of samples
+        self.deadband = Deadband(self.args.max_silence) # change-only publishing of parameters with deadband thresholds
+        self.raw_batch = RawBatch(self.args.raw_window) if self.args.packed and not self.args.dry_raw_payload else None # packed raw payloads
 
     def configure_client(self):
         client_id = self.generate_client_id()
@@ -24,13 +55,23 @@ class My_Client:
         # delay is the number of seconds to wait between successive reconnect attempts(default=1).
         # delay_max is the maximum number of seconds to wait between reconnection attempts(default=1)
         client.reconnect_delay_set(min_delay=5, max_delay=60)
-        if self.args.dry:
-            client.on_message = lambda client, userdata, message: self.dry_message(client, userdata, message)
-        else:
-            client.on_message = lambda client, userdata, message: self.publish_message(client, userdata, message)
+        # only route the message here, decoding and publishing run on the pipeline workers
+        client.on_message = lambda client, userdata, message: self.route_message(message.topic, message.payload)
         client.on_log = self.on_log
         return client
 
+    def configure_decoders(self):
+        defaults = {"range_action": self.args.range_action} # decoder settings from the command line
+        if self.args.decoders:
+            return DecoderRegistry.from_file(self.args.decoders, defaults)
+        return DecoderRegistry(defaults=defaults) # the EXO decoder for every device
+
+    def configure_publisher(self):
+        spool = None
+        if self.args.spool_dir: # keep measurements on disk when Beehive can't be reached
+            spool = Spool(self.args.spool_dir, max_size=self.args.spool_max_mb * 1024 * 1024)
+        return Publisher(max_queue=self.args.publish_queue_size, spool=spool, spool_always=self.args.spool_always)
+
     @staticmethod
     def generate_client_id():
         hostname = os.uname().nodename
@@ -50,7 +91,10 @@ class My_Client:
                     topics.append(topic)
             else:
                 logging.info(f"[MQTT CLIENT] No Device EUI(s) provided, subscribing to {self.args.mqtt_subscribe_topic}")
-                logging.warning(f"[MQTT CLIENT] WARNING! Subscribing to all devices may cause issues if Decoder class is not able to decode all devices.")
+                if self.decoders.default is None:
+                    logging.warning(f"[MQTT CLIENT] Uplinks of devices without a decoder in {self.args.decoders} will be dropped.")
+                else:
+                    logging.warning(f"[MQTT CLIENT] WARNING! Devices without their own decoder will be decoded with '{self.decoders.default}', this may cause issues if it is not able to decode all devices.")
                 topic = (f"{self.args.mqtt_subscribe_topic}", qos)
                 topics.append(topic)
 
@@ -67,14 +111,51 @@ class My_Client:
 
     @staticmethod
     def on_log(client, obj, level, string):
-        logging.debug(f"[MQTT CLIENT]: {string}") #prints if args.debug = true
+        logging.debug("[MQTT CLIENT]: %s", string) #prints if args.debug = true
+        return
+
+    def route_message(self, topic, payload):
+        """
+        Look at the topic before parsing anything: only uplinks of subscribed devices are queued
+        for decoding, other ChirpStack events are counted and dropped. Events with a handler are
+        queued too, so they reach the device's worker in order with its uplinks.
+        """
+        dev_eui, event = topic_route(topic)
+        if dev_eui is not None and self.dev_euis and dev_eui not in self.dev_euis:
+            event = "other_device"
+        elif event == "up":
+            self.pipeline.submit(topic, payload)
+            return
+        self.event_counts[event] = self.event_counts.get(event, 0) + 1
+        if event in self.event_handlers:
+            self.pipeline.submit(topic, payload)
+        else:
+            logging.debug(f"[MQTT CLIENT] Ignoring {event} event from {dev_eui}")
+        return
+
+    def on_join_event(self, dev_eui, payload):
+        logging.info(f"[MQTT CLIENT] Device {dev_eui} joined the network")
+        self.plr_calc.reset(dev_eui) # frame counters restart after a join
+        return
+
+    def handle_message(self, message):
+        if self.perf.enabled:
+            self.perf.record("queue", time.perf_counter() - message.received)
+        dev_eui, event = topic_route(message.topic)
+        if event != "up":
+            self.event_handlers[event](dev_eui, message.payload)
+        elif self.args.dry:
+            self.dry_message(self.client, None, message)
+        else:
+            self.publish_message(self.client, None, message)
         return
 
     def publish_message(self, client, userdata, message):
         self.log_message(message) #log message
 
         try: #get metadata and payload received
-            metadata = parse_message_payload(message.payload.decode("utf-8"))
+            with self.perf.stage("parse"):
+                metadata = parse_message_payload(message.payload.decode("utf-8"))
             payload = metadata.get("data")
             fport = metadata.get("fport")
             if fport == 0:
@@ -92,6 +173,10 @@ class My_Client:
             logging.error(f"[MQTT CLIENT] Failed to parse message: {e}")
             return
 
+        # drop uplinks that were already handled, before decoding them
+        if self.is_duplicate(metadata, payload):
+            return
+
         #Get Lorawan signal performance vals
         if self.args.signal_strength_indicators:
             Performance_vals = Get_Signal_Performance_values(metadata)
@@ -103,24 +188,37 @@ class My_Client:
         except:
             return
         
+        decoder = self.decoder_for(metadata)
+        if decoder is None:
+            return
+
         #decode payload
-        base64_decoded_payload = base64.b64decode(payload)
-        decoded_payload, sensor_timestamp = self.decoder.decode(base64_decoded_payload)
+        with self.perf.stage("base64"):
+            base64_decoded_payload = base64.b64decode(payload)
+        decode_start = time.perf_counter()
+        with self.perf.stage("decode"):
+            if self.archive is None:
+                decoded_payload, sensor_timestamp = decoder.decode_ns(base64_decoded_payload)
+            else: # the decoder hands the packet's records to the archive
+                sink = self.archive.sink(clean_string(Measurement_metadata.get("devEui") or "unknown"))
+                decoded_payload, sensor_timestamp = decoder.decode_ns(base64_decoded_payload, sink=sink)
+        decode_seconds = time.perf_counter() - decode_start
         measurements = decoded_payload.get("measurements", [])
+        n_params = len(measurements)
 
-        # Check if sensor timestamp is present
-        if sensor_timestamp:
-            # check the timestamp
-            try:
-                self.check_timestamp(sensor_timestamp)
-            except ValueError as e:
-                logging.error(f"[MQTT CLIENT] {e}")
-                return
-            # Convert sensor timestamp to nanoseconds
-            timestamp = convert_time(sensor_timestamp)
-        else:
-            # Use the timestamp from the network server and convert to time in nanoseconds
-            timestamp = convert_time(metadata["time"])
+        with self.perf.stage("timestamp"):
+            # Check if sensor timestamp is present, the decoder gives it in nanoseconds
+            if sensor_timestamp:
+                # check the timestamp
+                try:
+                    self.check_timestamp(sensor_timestamp)
+                except ValueError as e:
+                    logging.error(f"[MQTT CLIENT] {e}")
+                    return
+                timestamp = sensor_timestamp
+            else:
+                # Use the timestamp from the network server and convert to time in nanoseconds
+                timestamp = convert_time(metadata["time"])
 
         # Check measurements format
         try:
@@ -133,19 +231,30 @@ class My_Client:
         if not measurements:
             logging.debug(f"[MQTT CLIENT] No measurements returned from Decoder")
 
+        plan = self.publish_plan(decoder)
+
         # Don't publish raw payload if requested      
         if not self.args.dry_raw_payload:
-            measurements.append({"name": "raw_payload", "value": payload, "unit": "base64"})
+            if self.raw_batch is None:
+                measurements.append({"name": "raw_payload", "value": payload, "unit": "base64"})
+            elif plan.entry("raw_payload")[0]: # packed: compressed with the other uplinks of the window
+                self.raw_batch.add(timestamp, Measurement_metadata.get("devEui"), metadata.get("fCnt"), base64_decoded_payload)
         
         for measurement in measurements:
-            # Skip the measurement if it's in the ignore list
-            if measurement["name"] in self.args.ignore:
+            publish, name = plan.entry(measurement["name"]) # --collect/--ignore and cleaned name
+            if not publish:
                 continue
-            if self.args.collect: #true if not empty
-                if measurement["name"] in self.args.collect: #if not empty only publish measurements in list
-                    self.publish_measurement(measurement,timestamp,Measurement_metadata)
-            else: #else collect is empty so publish all measurements
-                self.publish_measurement(measurement,timestamp,Measurement_metadata)
+            if self.aggregator is not None and measurement["name"].startswith("env.") and measurement.get("quality") != "out_of_range":
+                # sensor values go into the window of their device, only the summaries are published
+                self.publish_windows(self.aggregator.add(Measurement_metadata.get("devEui"), name, measurement["value"],
+                                                         timestamp, measurement["unit"], Measurement_metadata))
+                continue
+            param = plan.parameter(measurement["name"])
+            if param is not None and not self.deadband.check(Measurement_metadata.get("devEui"), param, measurement["value"], timestamp):
+                continue # within the parameter's deadband
+            self.publish_measurement(measurement,name,timestamp,Measurement_metadata)
+        if self.aggregator is not None: # windows of devices that stopped sending
+            self.publish_windows(self.aggregator.expire())
 
         if self.args.signal_strength_indicators:
             #snr,pl,plr do not depend on gateway
@@ -154,34 +263,178 @@ class My_Client:
             self.publish_signal(measurement={"name": "signal.pl","value": pl},timestamp=timestamp, metadata=Performance_metadata)
             if plr is not None:
                 self.publish_signal(measurement={"name": "signal.plr","value": plr},timestamp=timestamp, metadata=Performance_metadata)
-            for val in Performance_vals['rxInfo']:
-                Performance_metadata['gatewayId'] = val["gatewayId"] #add gateway id to metadata since rssi and snr differ per gateway
-                self.publish_signal(measurement={"name": "signal.rssi","value": val["rssi"]},timestamp=timestamp, metadata=Performance_metadata)
-                self.publish_signal(measurement={"name": "signal.snr","value": val["snr"]},timestamp=timestamp, metadata=Performance_metadata)
+            if self.args.packed: # rssi/snr of all gateways in one record
+                self.publish_signal(measurement={"name": "signal.rxinfo","value": pack_rxinfo(Performance_vals['rxInfo'])},timestamp=timestamp, metadata=Performance_metadata, extra={"unit": "packed"})
+            else:
+                for val in Performance_vals['rxInfo']:
+                    gateway = {"gatewayId": val["gatewayId"]} #add gateway id to metadata since rssi and snr differ per gateway
+                    self.publish_signal(measurement={"name": "signal.rssi","value": val["rssi"]},timestamp=timestamp, metadata=Performance_metadata, extra=gateway)
+                    self.publish_signal(measurement={"name": "signal.snr","value": val["snr"]},timestamp=timestamp, metadata=Performance_metadata, extra=gateway)
+
+        if self.raw_batch is not None and self.raw_batch.due():
+            self.publish_raw_batch()
+
+        self.save_plr_state()
+
+        # publish pipeline timings alongside the signal metrics
+        for name, value, unit in self.perf.summary_if_due():
+            self.publisher.publish(name, value, time.time_ns(), {"unit": unit})
+
+        # report backpressure and suppressed duplicates
+        self.publish_counters()
+
+        # publish everything queued for this packet in one go
+        self.flush()
+
+        self.packet_log.packet(Measurement_metadata.get("devEui"), metadata.get("fCnt"), n_params, decode_seconds)
+
+        return
+
+    def is_duplicate(self, metadata, payload):
+        if self.dedup is None:
+            return False
+        device_info = metadata.get("deviceInfo") or {}
+        key = (device_info.get("devEui"), metadata.get("fCnt"), hash(payload))
+        if self.dedup.add(key):
+            return False
+        self.dedup_suppressed += 1
+        logging.debug("[MQTT CLIENT] Dropping duplicate uplink devEui=%s fCnt=%s", key[0], key[1])
+        return True
+
+    def publish_counters(self):
+        # publish counters that changed since they were last reported
+        counters = {
+            "plugin.pipeline.dropped": self.pipeline.dropped,
+            "plugin.publisher.dropped": self.publisher.dropped,
+            "plugin.dedup.suppressed": self.dedup_suppressed,
+            "plugin.decoders.unmatched": self.undecoded,
+            "plugin.deadband.suppressed": self.deadband.suppressed,
+        }
+        for event, count in list(self.event_counts.items()):
+            counters[f"plugin.events.{event}"] = count
+        for decoder in list(self.decoders.instances.values()): # values outside their scale, summed over decoders
+            for action, count in getattr(decoder, "range_counts", {}).items():
+                counters[f"plugin.range.{action}"] = counters.get(f"plugin.range.{action}", 0) + count
+        changed = False
+        for name, value in counters.items():
+            if self.reported_counters.get(name, 0) != value:
+                self.reported_counters[name] = value
+                self.publisher.publish(name, value, time.time_ns(), {"unit": "count"})
+                changed = True
+        if changed:
+            self.publisher.publish("plugin.pipeline.depth", self.pipeline.depth(), time.time_ns(), {"unit": "count"})
+        return
+
+    def publish_windows(self, closed):
+        # one record per stat of each closed window, timestamped at the window start
+        for device, name, stats in closed:
+            window = str(self.args.aggregate_window)
+            for stat, value in stats.summary():
+                self.publisher.publish(name, value, stats.start, stats.metadata, {"unit": stats.unit, "aggregate": stat, "window": window})
+        return
+
+    def publish_raw_batch(self):
+        # raw payloads of the window as one compressed value, packing.py decodes it
+        batch = self.raw_batch.take()
+        if batch is not None:
+            timestamp, count, value = batch
+            self.publisher.publish("raw_payload.batch", value, timestamp, {"unit": "zlib+base64", "count": str(count)})
+        return
+
+    def close(self):
+        # once the pipeline has stopped (also on SIGTERM), before the publisher session is closed.
+        # every step runs even if an earlier one failed, so held data is not lost to an unrelated error
+        steps = []
+        if self.aggregator is not None: # current windows are published as they are
+            steps.append(lambda: self.publish_windows(self.aggregator.drain()))
+        if self.raw_batch is not None: # raw payloads of the unfinished --raw-window
+            steps.append(self.publish_raw_batch)
+        steps.append(self.publisher.flush)
+        if self.archive is not None:
+            steps.append(self.archive.close)
+        steps.append(lambda: self.save_plr_state(force=True))
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                logging.error(f"[MQTT CLIENT] Error while shutting down: {e}")
+        return
+
+    def restore_plr_state(self):
+        # continue packet loss accounting where the previous run stopped
+        if self.args.plr_state:
+            devices = self.plr_calc.load(self.args.plr_state)
+            if devices:
+                logging.info(f"[MQTT CLIENT] restored packet loss state of {devices} device(s) from {self.args.plr_state}")
+        return
 
+    def save_plr_state(self, force=False):
+        # snapshot every --plr-state-interval seconds, never per packet
+        if not self.args.plr_state:
+            return
+        if force or time.monotonic() - self.plr_saved >= self.args.plr_state_interval:
+            self.plr_saved = time.monotonic()
+            self.plr_calc.save(self.args.plr_state)
         return
 
-    def publish_signal(self, measurement,timestamp,metadata):
-        self.publish(measurement,timestamp,metadata)
+    def health(self):
+        # counters a supervisor aggregates across worker processes
+        return {
+            "handled": self.pipeline.handled(),
+            "dropped": self.pipeline.dropped,
+            "publisher_dropped": self.publisher.dropped,
+            "depth": self.pipeline.depth(),
+            "suppressed": self.dedup_suppressed,
+            "undecoded": self.undecoded,
+            "devices": len(self.plr_calc.devices),
+        }
+
+    def flush(self):
+        with self.perf.stage("publish"):
+            self.publisher.flush()
+        return
+
+    def publish_signal(self, measurement,timestamp,metadata,extra=None):
+        self.publish(measurement,timestamp,metadata,extra)
         return
     
-    def publish_measurement(self, measurement,timestamp,metadata):
-        metadata["unit"] = measurement["unit"] # add unit to metadata
-        measurement = clean_message_measurement(measurement) #clean measurement names
-        self.publish(measurement,timestamp,metadata)
+    def publish_measurement(self, measurement,name,timestamp,metadata):
+        measurement["name"] = name # cleaned name from the publish plan
+        extra = {"unit": measurement["unit"]} # add unit to metadata
+        if "quality" in measurement: # value was outside its parameter's scale
+            extra["quality"] = measurement["quality"]
+        self.publish(measurement,timestamp,metadata,extra)
         return
 
-    @staticmethod
-    def publish(measurement,timestamp,metadata):
+    def decoder_for(self, metadata):
+        # pick the device's decoder from its devEui/deviceProfileName
+        device_info = metadata.get("deviceInfo") or {}
+        decoder = self.decoders.get(device_info.get("devEui"), device_info.get("deviceProfileName"))
+        if decoder is None:
+            self.undecoded += 1
+            logging.debug("[MQTT CLIENT] No decoder for devEui=%s profile=%s, dropping uplink",
+                          device_info.get("devEui"), device_info.get("deviceProfileName"))
+        return decoder
+
+    def publish_plan(self, decoder):
+        # one plan per decoder, rebuilt if the decoder reloaded its lookup table
+        plan = self.plans.get(decoder)
+        if plan is None or plan.lookup is not decoder.lookup:
+            plan = self.plans[decoder] = PublishPlan(decoder.lookup, self.args.collect, self.args.ignore)
+        return plan
+
+    def set_filters(self, collect, ignore):
+        """Change the --collect/--ignore filters at runtime."""
+        self.args.collect = collect
+        self.args.ignore = ignore
+        self.plans = {} # rebuilt with the new filters on the next packet of each decoder
+        return
+
+    def publish(self, measurement,timestamp,metadata,extra=None):
+        # metadata is a shared read-only template, per-measurement fields go in extra
         if measurement["value"] is not None: #avoid NULLs
-            with Plugin() as plugin: #publish lorawan data
-                try:
-                    plugin.publish(measurement["name"], measurement["value"], timestamp=timestamp, meta=metadata)
-                    # If the function succeeds, log a success message
-                    logging.info(f'[MQTT CLIENT] {measurement["name"]} published')
-                except Exception as e:
-                    # If an exception is raised, log an error message
-                    logging.error(f'[MQTT CLIENT] measurement {measurement["name"]} did not publish encountered an error: {str(e)}')
+            # queued on the long-lived publisher session, sent when the packet is flushed
+            self.publisher.publish(measurement["name"], measurement["value"], timestamp, metadata, extra)
         return
 
     def dry_message(self, client, userdata, message):
@@ -194,18 +447,17 @@ class My_Client:
 
     @staticmethod
     def log_message(message):
-            
-        data = (
-            "LORAWAN Message received: " + message.payload.decode("utf-8") + " with topic " + str(message.topic)
-        )
-        logging.info(f"[MQTT CLIENT] {data}") #log message received
+        # full payload dumps only with --debug, the per-packet summary is logged by PacketLog
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("[MQTT CLIENT] LORAWAN Message received: %s with topic %s", message.payload.decode("utf-8"), message.topic)
 
         return
 
     def log_measurements(self,message):
 
         try: #get metadata and payload received
-            metadata = parse_message_payload(message.payload.decode("utf-8"))
+            with self.perf.stage("parse"):
+                metadata = parse_message_payload(message.payload.decode("utf-8"))
             payload = metadata.get("data")
             fport = metadata.get("fport")
             if fport == 0:
@@ -223,13 +475,22 @@ class My_Client:
             logging.error(f"[MQTT CLIENT] Failed to parse message: {e}")
             return
 
+        if self.is_duplicate(metadata, payload):
+            return
+
         if self.args.signal_strength_indicators:
             Performance_vals = Get_Signal_Performance_values(metadata)
             Performance_metadata = Get_Signal_Performance_metadata(metadata)
         
+        decoder = self.decoder_for(metadata)
+        if decoder is None:
+            return
+
         #decode payload
-        payload = base64.b64decode(payload)
-        decoded_payload = self.decoder.decode(payload)
+        with self.perf.stage("base64"):
+            payload = base64.b64decode(payload)
+        with self.perf.stage("decode"):
+            decoded_payload, _ = decoder.decode(payload)
         measurements = decoded_payload.get("measurements", [])
 
         # Check measurements format
@@ -244,14 +505,10 @@ class My_Client:
             logging.debug(f"[MQTT CLIENT] No measurements returned from Decoder")   
         measurements.append({"name": "raw_payload", "value": payload, "unit": "base64"})
 
-        for measurement in measurements:
-            # Skip the measurement if it's in the ignore list
-            if measurement["name"] in self.args.ignore:
-                continue
-            if self.args.collect: #true if not empty
-                if measurement["name"] in self.args.collect: #if not empty only log measurements in list
-                    logging.info("[MQTT CLIENT] " + str(measurement["name"]) + ": " + str(measurement["value"]) + " unit: " + str(measurement["unit"]))
-            else: #else collect is empty so log all measurements
+        with self.perf.stage("log"):
+            plan = self.publish_plan(decoder)
+            for measurement in measurements:
+                if plan.entry(measurement["name"])[0]: # only log measurements that would be published
                     logging.info("[MQTT CLIENT] " + str(measurement["name"]) + ": " + str(measurement["value"]) + " unit: " + str(measurement["unit"]))
 
         if self.args.signal_strength_indicators:
@@ -264,6 +521,11 @@ class My_Client:
             logging.info(f"[MQTT CLIENT] packet loss: {pl}")
             if plr is not None:
                 logging.info(f"[MQTT CLIENT] packet loss rate: {plr:.2f}%")
+            self.save_plr_state()
+
+        # dry-run: pipeline timings are logged instead of published
+        for name, value, unit in self.perf.summary_if_due():
+            logging.info(f"[MQTT CLIENT] {name}: {value} {unit}")
 
         return
     
@@ -288,49 +550,44 @@ class My_Client:
 
     def check_timestamp(self, timestamp):
         """
-        Check if timestamp is in UTC ISO-8601 datetime format. "%Y-%m-%dT%H:%M:%S" or "%Y-%m-%dT%H:%M:%S.%f" with microseconds 
-        plus optional timezone (Z or +00:00).
+        Check if timestamp is an integer number of nanoseconds since the epoch (UTC), as returned by Decoder.decode_ns.
         examples:
-            - 2025-04-25T19:47:37.723532+00:00
-            - 2025-04-25T19:47:37Z
+            - 1745610457000000000 (2025-04-25T19:47:37+00:00)
         """
-        if not isinstance(timestamp, str):
-            raise ValueError("Timestamp must be a string.")
-
-        try:
-            # Try to parse the timestamp
-            datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-        except ValueError as e:
-            raise ValueError(f"Invalid ISO-8601 timestamp format: {timestamp}") from e
+        if not isinstance(timestamp, int):
+            raise ValueError("Timestamp must be an integer (ns since epoch).")
 
         # Check that it is in UTC
-        try:
-            self.is_packet_time_utc(timestamp)
-        except ValueError as e:
-            raise ValueError(f"{e}")
+        self.is_packet_time_utc(timestamp)
     
     @staticmethod
-    def is_packet_time_utc(packet_naive_dt, tolerance_minutes=30):
+    def is_packet_time_utc(timestamp_ns, tolerance_minutes=30):
         """
         Determines whether the given packet time is in UTC by comparing to system UTC time.
-        Assumes `packet_naive_dt` is a naive datetime object (no tzinfo).
+        Both are compared as ns since the epoch, no datetime objects are built.
         """
-        # Parse the ISO 8601 timestamp string
-        packet_naive_dt = datetime.fromisoformat(packet_naive_dt)
+        delta_seconds = abs(time.time_ns() - timestamp_ns) / 1e9
 
-        # Get the current UTC time based on the system clock
-        now_utc = datetime.now(timezone.utc)
-        
-        # Assume packet time might be UTC, so assign UTC and compare
-        packet_as_utc = packet_naive_dt.replace(tzinfo=timezone.utc)
-        delta_seconds = abs((now_utc - packet_as_utc).total_seconds())
-
-        # If difference is small (e.g., < 5 minutes), assume packet was in UTC
+        # If difference is small (e.g., < 30 minutes), assume packet was in UTC
         if delta_seconds > (tolerance_minutes * 60):
             raise ValueError(f"ERROR, Packet time is not in UTC. Difference: {delta_seconds} seconds")
 
+    def stop(self):
+        # end loop_forever, run() then publishes what is held back and saves the packet loss state
+        logging.info("[MQTT CLIENT] stopping...")
+        # disconnect from another thread, the signal may have interrupted paho while it holds its locks
+        threading.Thread(target=self.client.disconnect, name="stop", daemon=True).start()
+
     def run(self):
+        if threading.current_thread() is threading.main_thread(): # container stop, cron relaunch or supervisor
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
         logging.info(f"[MQTT CLIENT] connecting [{self.args.mqtt_server_ip}:{self.args.mqtt_server_port}]...")
         self.client.connect(host=self.args.mqtt_server_ip, port=self.args.mqtt_server_port, bind_address="0.0.0.0")
         logging.info("[MQTT CLIENT] waiting for callback...")
-        self.client.loop_forever()
+        self.pipeline.start()
+        with self.publisher:
+            try:
+                self.client.loop_forever()
+            finally:
+                self.pipeline.stop()
+                self.close()
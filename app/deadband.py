@@ -0,0 +1,36 @@
+import threading
+
+class Deadband:
+    """
+    Change-only publishing per parameter. A value is published when it moved more than the parameter's
+    absolute (deadband_abs) or relative (deadband_rel) threshold from the last published value, or when
+    max_silence seconds of sample time passed since then. Parameters without thresholds are always published.
+    Last published values are kept per device, keyed by decoder code.
+    """
+
+    def __init__(self, max_silence=3600):
+        self.max_silence_ns = int(max_silence * 1_000_000_000)  # default when the parameter has no Max Silence
+        self.devices = {}  # device -> {code: (last published value, its timestamp ns)}
+        self.suppressed = 0
+        self.lock = threading.Lock()  # pipeline workers share the table
+
+    def check(self, device, param, value, timestamp):
+        """Returns True if the value should be published, and then remembers it as the last published one."""
+        if param.deadband_abs is None and param.deadband_rel is None:
+            return True
+        silence = self.max_silence_ns if param.max_silence is None else int(param.max_silence * 1_000_000_000)
+        with self.lock:
+            table = self.devices.get(device)
+            if table is None:
+                table = self.devices[device] = {}
+            last = table.get(param.code)
+            if last is not None:
+                last_value, last_time = last
+                delta = abs(value - last_value)
+                if ((param.deadband_abs is None or delta <= param.deadband_abs)
+                        and (param.deadband_rel is None or delta <= param.deadband_rel * abs(last_value))
+                        and timestamp - last_time < silence):
+                    self.suppressed += 1
+                    return False
+            table[param.code] = (value, timestamp)
+        return True
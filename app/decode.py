@@ -0,0 +1,72 @@
+import argparse
+import base64
+import json
+import logging
+import struct
+import sys
+from datetime import datetime, timezone
+from decoder import Decoder, NS_PER_SECOND
+from parse import parse_message_payload, clean_string
+
+# Decode-only entry point: Decoder + parse, without MQTT, waggle or the publish pipeline, so it loads fast.
+# Reads ChirpStack uplink events (one JSON per line, as replay.py) or bare payloads (base64 or hex)
+# and prints one JSON object per packet.
+
+def read_payload(line):
+    """Returns (uplink event or None, payload bytes) of an input line."""
+    if line.startswith("{"):
+        message = parse_message_payload(line)
+        return message, base64.b64decode(message["data"])
+    try:
+        return None, bytes.fromhex(line)
+    except ValueError:
+        return None, base64.b64decode(line, validate=True)
+
+def decode_line(line, decoders):
+    message, payload = read_payload(line)
+    device_info = (message or {}).get("deviceInfo") or {}
+    decoder = decoders(device_info.get("devEui"), device_info.get("deviceProfileName"))
+    if decoder is None:
+        raise ValueError(f"no decoder for device {device_info.get('devEui')}")
+    decoded, timestamp = decoder.decode_ns(payload)
+    result = {}
+    if message is not None:
+        result["devEui"] = device_info.get("devEui")
+        result["fCnt"] = message.get("fCnt")
+    result["timestamp"] = datetime.fromtimestamp(timestamp // NS_PER_SECOND, timezone.utc).isoformat(timespec="seconds")
+    result["measurements"] = [dict(m, name=clean_string(m["name"])) for m in decoded["measurements"]]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode EXO packets without connecting to MQTT or Beehive")
+    parser.add_argument("input", nargs="?", help="file of uplink events or payloads, one per line. Read from stdin if omitted")
+    parser.add_argument("--csv", default="./parameters.csv", help="parameters lookup table")
+    parser.add_argument("--timezone", default=None, help="timezone of the sensor clock, America/Chicago if omitted")
+    parser.add_argument("--utc", action="store_true", default=False, help="the sensor clock is in UTC")
+    parser.add_argument("--decoders", default="", help="JSON file mapping devEui/deviceProfileName to decoders, as main.py --decoders")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.decoders:
+        from registry import DecoderRegistry
+        decoders = DecoderRegistry.from_file(args.decoders).get
+    else:
+        decoder = Decoder(args.csv)
+        decoder.sensor_time_is_utc = args.utc
+        if args.timezone:
+            decoder.sensor_timezone = args.timezone
+        decoders = lambda dev_eui, profile: decoder
+
+    lines = open(args.input) if args.input else sys.stdin
+    with lines:
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                print(json.dumps(decode_line(line, decoders)))
+            except (ValueError, KeyError, struct.error) as e: # base64/hex errors are ValueErrors
+                logging.error(f"[DECODE] line {number}: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 # -*- coding: utf-8 -*-
 
 # Decoding data coming from EXO sensor via Arduino + loRaWAN
+import math
 import struct
-from datetime import datetime, timezone
-import pandas as pd
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import crcmod
+import csv
 import os
 import logging
-from typing import Tuple, List, TypedDict, Union
-from zoneinfo import ZoneInfo
+from types import MappingProxyType
+from typing import Tuple, List, Dict, TypedDict, Union, NamedTuple, Optional, Mapping
 
 # Define types for the payload and timestamp
 Timestamp_utc_iso8601 = str
@@ -21,14 +24,109 @@ class Measurement(TypedDict):
 class Payload(TypedDict):
     measurements: List[Measurement]
 
+class Parameter(NamedTuple):
+    code: int
+    description: str  # "Name, unit" as written in parameters.csv
+    name: str   # parameter name with spaces replaced by '_'
+    unit: str   # unit without spaces, '' if none
+    topic: str  # env.<name>.<unit> topic
+    scale_low: Optional[float]
+    scale_high: Optional[float]
+    range_action: Optional[str] = None  # what to do with values outside the scale, None uses the decoder's range_action
+    deadband_abs: Optional[float] = None  # change-only publishing: absolute change that is published
+    deadband_rel: Optional[float] = None  # relative change (fraction of the last published value) that is published
+    max_silence: Optional[float] = None  # seconds after which an unchanged value is published again
+
+def make_parameter(code, description, scale_low=None, scale_high=None, range_action=None,
+                   deadband_abs=None, deadband_rel=None, max_silence=None) -> Parameter:
+    # split "Name, unit" once so decode does not have to do it per packet
+    parts = description.split(',')
+    name = parts[0].replace(' ','_')
+    unit = parts[1].replace(' ','') if len(parts) > 1 else ""
+    dot_unit = "."+unit if unit else ""
+    return Parameter(code, description, name, unit, 'env.'+name+dot_unit, scale_low, scale_high, range_action,
+                     deadband_abs, deadband_rel, max_silence)
+
+SAMPLING_PERIOD = make_parameter(0, 'Sampling period, sec')
+HEARTBEAT = make_parameter(255, 'heartbeat')
+
+# Packet layout: reserved, version, device_id (1 byte each), date, time (float32 each),
+# then records of code, status (1 byte each) and value (float32), then CRC-8
+HEADER_SIZE = 11
+RECORD_SIZE = 6
+
+# Actions for values outside a parameter's Scale Low/Scale High, their index is the 'quality' column of decode_batch
+RANGE_ACTIONS = ('off', 'flag', 'clamp', 'drop')
+RANGE_COUNTERS = {'flag': 'flagged', 'clamp': 'clamped', 'drop': 'dropped'}
+
+NS_PER_SECOND = 1_000_000_000
+UTC_TOLERANCE = 30 * 60  # packet times closer than this (seconds) to the system UTC time are taken as UTC
+MAX_CACHED_OFFSETS = 4096
+EPOCH = datetime(1970, 1, 1)
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def days_from_civil(year, month, day):
+    # days since 1970-01-01 of a Gregorian date, integer arithmetic only (H. Hinnant's days_from_civil)
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+def packet_wall_seconds(date_float, time_float):
+    """
+    Seconds since epoch of the packet's DDMMYY date and HHMMSS time floats, read as UTC wall time.
+    Raises ValueError if they do not form a valid date and time.
+    """
+    try:
+        date = int(date_float) % 1_000_000
+        clock = int(time_float)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid date/time: {date_float} {time_float}")
+    day, month, year = date // 10000, date // 100 % 100, date % 100
+    year += 2000 if year < 69 else 1900  # same pivot as strptime's %y
+    if not 1 <= month <= 12 or not 1 <= day <= DAYS_IN_MONTH[month - 1] + (month == 2 and is_leap(year)):
+        raise ValueError(f"Invalid date: {date:06d}")
+    hour, minute, second = clock // 10000, clock // 100 % 100, clock % 100
+    if not (0 <= hour < 24 and minute < 60 and second < 60):
+        raise ValueError(f"Invalid time: {time_float}")
+    return days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+
 class Decoder: # This class is used to decode the data received from the sensor
 
-    def __init__(self): 
+    def __init__(self, csv_file='./parameters.csv', reload_on_change=False, range_action='flag'): 
         # Set your data/timezone here
         self.sensor_timezone = 'America/Chicago'
         self.sensor_time_is_utc = False
+        self.range_action = range_action # default action for values outside the scale of their parameter
+        self.range_counts = dict.fromkeys(RANGE_COUNTERS.values(), 0) # values flagged/clamped/dropped so far
+        self.range_lock = threading.Lock()
+        self.range_arrays_cache = None
+        self.zone = None
+        self.utc_offsets = {}  # hours since epoch (local wall time) -> UTC offset in seconds
+
+        # Build CRC function and lookup table once, not per packet
+        self.crc8_func = crcmod.mkCrcFun(0x107, initCrc=0x00, rev=False)
+        self.crc_table = bytes(self.crc8_func(bytes([b])) for b in range(256)) # CRC-8 of every byte value, for decode_batch
+        self.csv_file = os.path.abspath(os.path.join(os.path.dirname(__file__), csv_file))
+        self.reload_on_change = reload_on_change # opt-in: reload lookup table if the csv file changes
+        self.csv_mtime = None
+        self.lookup = self.load_lookup_table()
+        self.bounds = self.load_bounds(self.lookup)
 
     def decode(self, payload: bytes) -> Tuple[Payload, Timestamp_utc_iso8601]:
+        # Same as decode_ns, with the timestamp formatted as ISO-8601
+        decoded = self.decode_ns(payload)
+        if not isinstance(decoded, tuple):
+            return decoded
+        payload, timestamp_ns = decoded
+        return payload, datetime.fromtimestamp(timestamp_ns // NS_PER_SECOND, timezone.utc).isoformat(timespec='seconds')
+
+    def decode_ns(self, payload: bytes, sink=None) -> Tuple[Payload, int]:
         # Decode the payload and return a dictionary with the decoded values in this structure:
         # payload = {
         #   measurements:[
@@ -37,6 +135,7 @@ class Decoder: # This class is used to decode the data received from the sensor
         #   ]
         # }
         # This is a placeholder function. The actual decoding logic should be implemented here.
+        # sink, if given, is called with (timestamp ns, device_id, [(Parameter, value, status)]) of the packet.
         
         if isinstance(payload, str):
            try:
@@ -46,60 +145,291 @@ class Decoder: # This class is used to decode the data received from the sensor
                logging.error("[DECODER] Error converting payload to bytes: ", e)
                return {"error": "invalid hex string"}
             
-        self.crc8_func = crcmod.mkCrcFun(0x107, initCrc=0x00, rev=False)
-        
-        # Load lookup table for parameter names
-        lookup_dict = self.load_lookup_table()   
+        # Reload lookup table only if requested and the csv changed
+        if self.reload_on_change:
+            self.check_lookup_table()
     
         # Decode parameters from packet
-        date, time, version, device_id, df = self.process_packet(payload, lookup_dict)
-
-        # Get measurement timestamp ISO-8601
-        dt_naive = datetime.strptime(date + '-' + time, '%d-%m-%Y-%H:%M:%S')
-        if self.is_packet_time_utc(dt_naive) or self.sensor_time_is_utc:
-            # If the packet time is in UTC or sensor time is set to UTC, assign UTC timezone
-            logging.debug("[DECODER] Packet time appears to be in UTC.")
-            dt = dt_naive.replace(tzinfo=timezone.utc)
-        else:
-            # If the packet time is not in UTC, assume it's local time and convert to UTC
-            logging.debug("[DECODER] Packet time appears to be local; converting to UTC.")
-            local_zone = ZoneInfo(self.sensor_timezone)
-            dt = dt_naive.replace(tzinfo=local_zone).astimezone(timezone.utc)
-            logging.debug(f"[DECODER] Packet time: {dt_naive} ({self.sensor_timezone}) -> {dt} (UTC)")
-        timestamp = dt.isoformat(timespec='seconds')
+        packet_date, packet_time, version, device_id, records = self.process_packet(payload, self.lookup)
+
+        # Get measurement timestamp, ns since epoch (UTC)
+        timestamp = self.packet_timestamp_ns(packet_date, packet_time)
+        if sink is not None:
+            sink(timestamp, device_id, records)
    
         # Build dictionary of parameters
         measurements = [{"name": "device_id", "value": device_id, "unit": ""}, 
                         {"name": "version", "value": version, "unit": ""}]
                         
-        for _, row in df.iterrows():
-            if row['Status'] != "Available": # skip NaN values (status!=0)
-                logging.debug(f"[DECODER] Skipping unavailable parameter: {row['Parameter']}")
+        for param, value, status in records:
+            if value is None: # skip NaN values (status!=0)
+                logging.debug("[DECODER] Skipping unavailable parameter: %s", param.name)
                 continue
                 
-            param_name = row['Parameter'].split(',')[0].replace(' ','_')
-            try:
-                param_unit = row['Parameter'].split(',')[1].replace(' ','')
-                dot_unit = "."+param_unit
-            except:
-                param_unit = ""
-                dot_unit = ""
-                
-            data = {"name": 'env.'+param_name+dot_unit, # environmental data
-                    "value": row['Value'],
-                    "unit": param_unit}
-            measurements.append( data )
+            measurement = {"name": param.topic, # environmental data
+                           "value": value,
+                           "unit": param.unit}
+
+            # range check against the precomputed scale of the parameter
+            bounds = self.bounds.get(param.code)
+            if bounds is not None and not bounds[0] <= value <= bounds[1]:
+                checked = self.out_of_range(param, value, bounds)
+                if checked is None:
+                    continue
+                measurement["value"], quality = checked
+                if quality:
+                    measurement["quality"] = quality
+
+            measurements.append(measurement)
     
         payload = {"measurements": measurements}
         return payload, timestamp
      
-    def load_lookup_table(self, csv_file='./parameters.csv' ):
-        # Load the correct lookup table from the uploaded CSV
-        csv_file = os.path.abspath(os.path.join(os.path.dirname(__file__), csv_file))
-        logging.debug(f"[DECODER] lookup table: {csv_file}")
-        lookup_df = pd.read_csv(csv_file)
-        lookup_dict = dict(zip(lookup_df['Code'], lookup_df['Parameter']))
-        return lookup_dict #  dictionary of parameter names indexed by register code
+    def out_of_range(self, param, value, bounds):
+        """
+        Applies the range action to a value outside [low, high]: returns (value, quality tag), or None to drop it.
+        NaN values are dropped when the action is clamp.
+        """
+        low, high, action = bounds
+        action = action or self.range_action
+        if action == 'flag':
+            result = (value, 'out_of_range')
+        elif action == 'clamp' and not math.isnan(value):
+            result = (min(max(value, low), high), 'clamped')
+        elif action in ('clamp', 'drop'):
+            action, result = 'drop', None
+        else:
+            return value, None
+        with self.range_lock:
+            self.range_counts[RANGE_COUNTERS[action]] += 1
+        logging.debug("[DECODER] %s=%s outside [%s, %s]: %s", param.name, value, low, high, action)
+        return result
+
+    def range_arrays(self):
+        # per-code low/high bounds and action index for decode_batch, rebuilt when the lookup table or range_action change
+        import numpy as np
+        key = (self.bounds, self.range_action)
+        if self.range_arrays_cache is None or self.range_arrays_cache[0] != key:
+            low = np.full(256, -np.inf, dtype=np.float32)
+            high = np.full(256, np.inf, dtype=np.float32)
+            action = np.zeros(256, dtype=np.uint8)
+            for code, (code_low, code_high, code_action) in self.bounds.items():
+                low[code], high[code] = code_low, code_high
+                action[code] = RANGE_ACTIONS.index(code_action or self.range_action)
+            self.range_arrays_cache = (key, low, high, action)
+        return self.range_arrays_cache[1:]
+
+    def packet_timestamp_ns(self, date_float, time_float) -> int:
+        # Get measurement time in ns since epoch (UTC) from the decoded date and time floats
+        seconds = packet_wall_seconds(date_float, time_float)
+        if self.sensor_time_is_utc or abs(time.time() - seconds) < UTC_TOLERANCE:
+            # If the packet time is in UTC or sensor time is set to UTC, no conversion needed
+            return seconds * NS_PER_SECOND
+        # If the packet time is not in UTC, assume it's local time and convert to UTC
+        return (seconds - self.utc_offset(seconds)) * NS_PER_SECOND
+
+    def utc_offset(self, wall_seconds) -> int:
+        """UTC offset in seconds of the sensor timezone at a local wall time, cached per hour."""
+        if self.zone is None or self.zone.key != self.sensor_timezone:
+            from zoneinfo import ZoneInfo # only needed once a packet in local time arrives
+            self.zone = ZoneInfo(self.sensor_timezone)
+            self.utc_offsets = {}
+        hour = wall_seconds // 3600
+        offset = self.utc_offsets.get(hour)
+        if offset is None:
+            if len(self.utc_offsets) >= MAX_CACHED_OFFSETS:
+                self.utc_offsets = {}
+            offset = int(self.zone.utcoffset(EPOCH + timedelta(hours=hour)).total_seconds())
+            self.utc_offsets[hour] = offset
+            logging.debug("[DECODER] UTC offset of %s at %s: %d s", self.sensor_timezone, EPOCH + timedelta(hours=hour), offset)
+        return offset
+
+    def decode_batch(self, payloads: List[bytes]) -> Dict[str, "numpy.ndarray"]:
+        """
+        Decode many packets at once into columnar arrays, one entry per parameter record:
+            packet (index into payloads), timestamp (ns since epoch), device_id, code, value, status, quality
+        quality is the index in RANGE_ACTIONS of the action applied to a value outside its scale, 0 if none.
+        Clamped values are replaced in 'value', dropped ones and unavailable ones (status != 0) are NaN.
+        Packets with the same number of (code, status, float32) records are decoded together with
+        numpy structured dtypes. Packets with code 0/255 records, or that do not fit the layout,
+        are decoded one by one. Indices of packets that fail CRC or decoding are returned in 'invalid'.
+        """
+        import numpy as np
+
+        if self.reload_on_change:
+            self.check_lookup_table()
+
+        # group packets by number of records
+        groups = {}
+        fallback = []
+        for i, payload in enumerate(payloads):
+            n_bytes = len(payload) - HEADER_SIZE - 1
+            if n_bytes > 0 and n_bytes % RECORD_SIZE == 0:
+                groups.setdefault(n_bytes // RECORD_SIZE, []).append(i)
+            else:
+                fallback.append(i)
+
+        crc_table = np.frombuffer(self.crc_table, dtype=np.uint8)
+        record_dtype = np.dtype([('code', 'u1'), ('status', 'u1'), ('value', '<f4')])
+        columns = {key: [] for key in ('packet', 'timestamp', 'device_id', 'code', 'value', 'status')}
+        invalid = []
+
+        for n_records, indices in groups.items():
+            indices = np.array(indices)
+            packet_dtype = np.dtype([('reserved', 'u1'), ('version', 'u1'), ('device_id', 'u1'),
+                                     ('date', '<f4'), ('time', '<f4'),
+                                     ('records', record_dtype, (n_records,)), ('crc', 'u1')])
+            buffer = b''.join(payloads[i] for i in indices)
+            packets = np.frombuffer(buffer, dtype=packet_dtype)
+            raw = np.frombuffer(buffer, dtype=np.uint8).reshape(len(indices), packet_dtype.itemsize)
+
+            # CRC-8 of every packet in the group, one byte column at a time
+            crc = np.zeros(len(indices), dtype=np.uint8)
+            for column in raw[:, :-1].T:
+                crc = crc_table[crc ^ column]
+            crc_ok = crc == packets['crc']
+            invalid.extend(indices[~crc_ok].tolist())
+
+            # code 0 and 255 records have a different size, decode those packets one by one
+            codes = packets['records']['code']
+            irregular = ((codes == 0) | (codes == 255)).any(axis=1)
+            fallback.extend(indices[crc_ok & irregular].tolist())
+
+            selected = crc_ok & ~irregular
+            packets = packets[selected]
+            packet_ts = np.empty(len(packets), dtype=np.int64)
+            keep = np.ones(len(packets), dtype=bool)
+            for j, (date_float, time_float) in enumerate(zip(packets['date'].tolist(), packets['time'].tolist())):
+                try:
+                    packet_ts[j] = self.packet_timestamp_ns(date_float, time_float)
+                except ValueError as e:
+                    logging.error(f"[DECODER] Invalid packet timestamp: {e}")
+                    keep[j] = False
+            invalid.extend(indices[selected][~keep].tolist())
+            packets = packets[keep]
+            packet_ts = packet_ts[keep]
+
+            records = packets['records']
+            columns['packet'].append(np.repeat(indices[selected][keep], n_records))
+            columns['timestamp'].append(np.repeat(packet_ts, n_records))
+            columns['device_id'].append(np.repeat(packets['device_id'], n_records))
+            columns['code'].append(records['code'].ravel())
+            columns['value'].append(np.where(records['status'] == 0, records['value'], np.nan).ravel())  # unavailable values are NaN
+            columns['status'].append(records['status'].ravel())
+
+        # scalar path for packets that do not fit the fixed layout
+        for i in fallback:
+            try:
+                packet_date, packet_time, version, device_id, records = self.process_packet(payloads[i], self.lookup)
+                timestamp = self.packet_timestamp_ns(packet_date, packet_time)
+            except (ValueError, IndexError, struct.error) as e:
+                logging.error(f"[DECODER] Could not decode packet {i}: {e}")
+                invalid.append(i)
+                continue
+            n_records = len(records)
+            columns['packet'].append(np.full(n_records, i))
+            columns['timestamp'].append(np.full(n_records, timestamp, dtype=np.int64))
+            columns['device_id'].append(np.full(n_records, device_id, dtype=np.uint8))
+            columns['code'].append(np.array([param.code for param, _, _ in records], dtype=np.uint8))
+            columns['value'].append(np.array([np.nan if value is None else value for _, value, _ in records], dtype=np.float32))
+            columns['status'].append(np.array([status for _, _, status in records], dtype=np.uint8))
+
+        dtypes = {'packet': np.int64, 'timestamp': np.int64, 'device_id': np.uint8,
+                  'code': np.uint8, 'value': np.float32, 'status': np.uint8}
+        result = {key: np.concatenate(values).astype(dtypes[key]) if values else np.empty(0, dtype=dtypes[key])
+                  for key, values in columns.items()}
+
+        # range check, vectorized over all records with the per-code bounds
+        low, high, action = self.range_arrays()
+        codes, values = result['code'], result['value']
+        outside = (result['status'] == 0) & ~((values >= low[codes]) & (values <= high[codes]))
+        quality = np.where(outside, action[codes], 0).astype(np.uint8)
+        clamp = quality == RANGE_ACTIONS.index('clamp')
+        quality[clamp & np.isnan(values)] = RANGE_ACTIONS.index('drop')
+        clamp &= ~np.isnan(values)
+        values[clamp] = np.clip(values[clamp], low[codes[clamp]], high[codes[clamp]])
+        values[quality == RANGE_ACTIONS.index('drop')] = np.nan
+        result['quality'] = quality
+        counts = np.bincount(quality, minlength=len(RANGE_ACTIONS))
+        with self.range_lock:
+            for index, name in enumerate(RANGE_ACTIONS):
+                if name in RANGE_COUNTERS:
+                    self.range_counts[RANGE_COUNTERS[name]] += int(counts[index])
+
+        # keep records in input order
+        order = np.argsort(result['packet'], kind='stable')
+        result = {key: values[order] for key, values in result.items()}
+        result['invalid'] = np.array(sorted(invalid), dtype=np.int64)
+        return result
+
+    def to_dataframe(self, payload: bytes):
+        # Tabular export of a packet, pandas is only imported here
+        import pandas as pd
+        packet_date, packet_time, version, device_id, records = self.process_packet(payload, self.lookup)
+        return pd.DataFrame([{
+            'Date': self.decode_date(packet_date),
+            'Time': self.decode_time(packet_time),
+            'Code': param.code,
+            'Parameter': param.description,
+            'Status': 'Available' if value is not None else 'Unavailable',
+            'Value': value
+        } for param, value, status in records])
+
+    def load_lookup_table(self) -> Mapping[int, Parameter]:
+        # Load the lookup table from the CSV and precompute name, unit, topic and scale per code
+        logging.debug(f"[DECODER] lookup table: {self.csv_file}")
+        self.csv_mtime = os.stat(self.csv_file).st_mtime
+        lookup_dict = {}
+        with open(self.csv_file, newline='') as f:
+            for row in csv.DictReader(f):
+                code = int(row['Code'])
+                lookup_dict[code] = make_parameter(code, row['Parameter'],
+                                                   self.parse_scale(row.get('Scale Low')),
+                                                   self.parse_scale(row.get('Scale High')),
+                                                   self.parse_range_action(code, row.get('Range Action')),
+                                                   self.parse_scale(row.get('Deadband Abs')),
+                                                   self.parse_scale(row.get('Deadband Rel')),
+                                                   self.parse_scale(row.get('Max Silence')))
+        return MappingProxyType(lookup_dict) #  read-only dictionary of parameters indexed by register code
+
+    @staticmethod
+    def load_bounds(lookup):
+        # (low, high, action) per code with a scale, looked up once per record by decode
+        return MappingProxyType({code: (-math.inf if param.scale_low is None else param.scale_low,
+                                        math.inf if param.scale_high is None else param.scale_high,
+                                        param.range_action)
+                                 for code, param in lookup.items()
+                                 if param.scale_low is not None or param.scale_high is not None})
+
+    def check_lookup_table(self):
+        # Rebuild the lookup table if the csv file was modified since it was loaded
+        try:
+            mtime = os.stat(self.csv_file).st_mtime
+        except OSError as e:
+            logging.error(f"[DECODER] Could not stat lookup table: {e}")
+            return
+        if mtime != self.csv_mtime:
+            logging.info(f"[DECODER] lookup table changed, reloading {self.csv_file}")
+            self.lookup = self.load_lookup_table()
+            self.bounds = self.load_bounds(self.lookup)
+
+    @staticmethod
+    def parse_range_action(code, value):
+        # optional 'Range Action' column, empty uses the decoder's range_action
+        value = (value or '').strip().lower()
+        if not value:
+            return None
+        if value not in RANGE_ACTIONS:
+            logging.error(f"[DECODER] Unknown range action '{value}' for code {code}, expected one of {RANGE_ACTIONS}")
+            return None
+        return value
+
+    @staticmethod
+    def parse_scale(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
 
     @staticmethod
     def decode_date(value):
@@ -127,8 +457,7 @@ class Decoder: # This class is used to decode the data received from the sensor
         # --- CRC ---
         crc = payload[-1]
         if not self.verify_crc8(payload[:-1], crc):
-            logging.error("Incorrect CRC.")
-            return None
+            raise ValueError("Incorrect CRC")
 
         # --- HEADER + PARAMETERS ---
         index = 0
@@ -142,10 +471,8 @@ class Decoder: # This class is used to decode the data received from the sensor
         date_float = struct.unpack('<f', date_bytes)[0]   
         time_float = struct.unpack('<f', time_bytes)[0]
 
-        date = self.decode_date(date_float)
-        time = self.decode_time(time_float)
-    
         # --- PARAMETERS ---
+        # (Parameter, value, status) triples, value is None when the sensor reports it unavailable (status!=0)
         decoded_data = []
         while index < len(payload) - 1:
             code = payload[index]; index += 1
@@ -154,32 +481,25 @@ class Decoder: # This class is used to decode the data received from the sensor
                 status = 0
                 value_bytes = payload[index:index+2]; index += 2
                 value = int.from_bytes(value_bytes, byteorder='little')
-                name = 'Sampling period, sec'
+                param = SAMPLING_PERIOD
             elif code == 255:
                 status = 0
                 value = payload[index]; index += 1
-                name = 'heartbeat'
+                param = HEARTBEAT
             else:
                 status = payload[index]; index += 1
                 value_bytes = payload[index:index+4]; index += 4
                 value = struct.unpack('<f', value_bytes)[0]
-                name = lookup_dict.get(code, f"Unknown (Code {code})")
-
-            status = 'Available' if status == 0 else 'Unavailable'
-            value = value if status == 'Available' else None
-
-            decoded_data.append({
-                'Date': date,
-                'Time': time,
-                'Code': code,
-                'Parameter': name,
-                'Status': status,
-                'Value': value
-            })
+                param = lookup_dict.get(code)
+                if param is None:
+                    param = make_parameter(code, f"Unknown (Code {code})")
+
+            decoded_data.append((param, value if status == 0 else None, status))
         
-        logging.debug(f"[DECODER] processed packet: ({date} {time}) Packet from devID={device_id} v.{version}. #parameters: {len(decoded_data)}")
+        logging.debug("[DECODER] processed packet: (%s %s) Packet from devID=%s v.%s. #parameters: %d", date_float, time_float, device_id, version, len(decoded_data))
 
-        return date, time, version, device_id, pd.DataFrame(decoded_data)
+        # date (DDMMYY) and time (HHMMSS) are returned as sent, decode_date/decode_time format them for display
+        return date_float, time_float, version, device_id, decoded_data
     
     @staticmethod
     def is_packet_time_utc(packet_naive_dt, tolerance_minutes=30):
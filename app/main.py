@@ -1,9 +1,8 @@
 import logging
 import argparse
 import os
-from client import *
 
-def main():
+def get_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("--debug", action="store_true", help="enable debug logs")
     parser.add_argument(
@@ -42,6 +41,12 @@ def main():
         default=[],  # default if nothing is provided
         help="A list of chirpstack measurements to ignore (opposite of --collect). If empty all will be retrieved (ex: --ignore m1 m2 m3)"
     )
+    parser.add_argument(
+        "--log-interval",
+        default=os.getenv("LOG_INTERVAL", 0),
+        help="minimum seconds between uplink summary log lines per device, 0 logs every uplink. Full payloads are only logged with --debug",
+        type=int
+    )
     parser.add_argument(
         "--signal-strength-indicators",
         action="store_true",
@@ -54,12 +59,140 @@ def main():
         help="plr's(packet loss rate) time interval in seconds, for example 3600 will mean plr will be measured every hour",
         type=int
     )
+    parser.add_argument(
+        "--plr-state",
+        default=os.getenv("PLR_STATE", ""),
+        help="file the packet loss state of each device is saved to and restored from on startup, so plr continues across restarts. Empty keeps it in memory only",
+    )
+    parser.add_argument(
+        "--plr-state-interval",
+        default=os.getenv("PLR_STATE_INTERVAL", 60),
+        help="seconds between saves of the packet loss state to --plr-state, it is also saved on shutdown",
+        type=int
+    )
     parser.add_argument(
         "--dry-raw-payload",
         default=os.getenv("DRY_RAW_PAYLOAD", False),
         help="Pass flag to NOT publish raw payload to beehive",
         type=bool
     )
+    parser.add_argument(
+        "--publish-queue-size",
+        default=os.getenv("PUBLISH_QUEUE_SIZE", 1000),
+        help="maximum number of measurements waiting to be published, oldest are dropped when full and counted in plugin.publisher.dropped",
+        type=int
+    )
+    parser.add_argument(
+        "--perf-interval",
+        default=os.getenv("PERF_INTERVAL", 0),
+        help="publish per-stage pipeline timings (plugin.perf.*) every N seconds, 0 disables timing",
+        type=int
+    )
+    parser.add_argument(
+        "--spool-dir",
+        default=os.getenv("SPOOL_DIR", ""),
+        help="directory of the on-disk spool for measurements that could not be published. Empty disables spooling",
+    )
+    parser.add_argument(
+        "--spool-always",
+        action="store_true",
+        default=False,
+        help="write every measurement to the spool before publishing it, not only on failure. Needs --spool-dir",
+    )
+    parser.add_argument(
+        "--spool-max-mb",
+        default=os.getenv("SPOOL_MAX_MB", 100),
+        help="maximum size of the spool in MB, oldest measurements are evicted first",
+        type=int
+    )
+    parser.add_argument(
+        "--dedup-ttl",
+        default=os.getenv("DEDUP_TTL", 600),
+        help="seconds an uplink (devEui, fCnt, payload) is remembered to drop duplicate deliveries, 0 disables",
+        type=int
+    )
+    parser.add_argument(
+        "--workers",
+        default=os.getenv("WORKERS", 1),
+        help="number of decode/publish worker threads, messages of the same device always go to the same worker. 0 handles messages in the MQTT callback",
+        type=int
+    )
+    parser.add_argument(
+        "--worker-queue-size",
+        default=os.getenv("WORKER_QUEUE_SIZE", 1000),
+        help="maximum number of received messages waiting per worker, new messages are dropped when full",
+        type=int
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        default=False,
+        help="run the MQTT subscription in an asyncio event loop instead of the threaded paho loop",
+    )
+    parser.add_argument(
+        "--publish-concurrency",
+        default=os.getenv("PUBLISH_CONCURRENCY", 4),
+        help="asyncio mode: maximum number of Beehive publishes awaited at the same time",
+        type=int
+    )
+    parser.add_argument(
+        "--aggregate-window",
+        default=os.getenv("AGGREGATE_WINDOW", 0),
+        help="publish mean/min/max/last/count/std of each sensor parameter per device over tumbling windows of N seconds instead of every sample, 0 disables",
+        type=int
+    )
+    parser.add_argument(
+        "--max-silence",
+        default=os.getenv("MAX_SILENCE", 3600),
+        help="seconds after which a value within its deadband (Deadband Abs/Deadband Rel columns of parameters.csv) is published again, unless the parameter has its own Max Silence",
+        type=int
+    )
+    parser.add_argument(
+        "--packed",
+        action="store_true",
+        default=False,
+        help="packed publishing: rssi/snr of all gateways in one signal.rxinfo record per uplink, raw payloads compressed together every --raw-window seconds (raw_payload.batch). Decode them with packing.py",
+    )
+    parser.add_argument(
+        "--raw-window",
+        default=os.getenv("RAW_WINDOW", 300),
+        help="packed mode: seconds of raw payloads compressed into one raw_payload.batch",
+        type=int
+    )
+    parser.add_argument(
+        "--range-action",
+        default=os.getenv("RANGE_ACTION", "flag"),
+        choices=["off", "flag", "clamp", "drop"],
+        help="what to do with values outside their parameter's Scale Low/Scale High: flag (add a quality tag), clamp, drop or off. A 'Range Action' column in parameters.csv overrides it per code",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=os.getenv("ARCHIVE_DIR", ""),
+        help="directory of a local archive of decoded records, one file per day and device (see archive.py). Empty disables it",
+    )
+    parser.add_argument(
+        "--processes",
+        default=os.getenv("PROCESSES", 1),
+        help="number of client processes, --dev_eui is split between them by consistent hashing. More than 1 runs a supervisor that restarts workers and publishes plugin.supervisor.* totals",
+        type=int
+    )
+    parser.add_argument(
+        "--health-interval",
+        default=os.getenv("HEALTH_INTERVAL", 30),
+        help="seconds between worker health reports when --processes is more than 1",
+        type=int
+    )
+    parser.add_argument(
+        "--decoders",
+        default=os.getenv("DECODERS", ""),
+        help="JSON file mapping devEui/deviceProfileName to decoders, each with its own lookup table and timezone. Empty decodes every device with the EXO decoder",
+    )
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        default=False,
+        help="log the import time of the client modules and the slowest imports at startup (see startup.py)",
+    )
     parser.add_argument(
         "--dev_eui",
         nargs="*",  # 0 or more values expected => creates a list
@@ -67,24 +200,52 @@ def main():
         default=[],
         help="Device EUI(s) to retrieve packets from. If empty none will be retrieved (ex: --dev_eui 1234567890abcdef 5554567691abcdef). They MUST be registered in Network server!",
     )
-    
-    #get args
-    args = parser.parse_args()
+    return parser
 
-    #configure logging
+def configure_logging(debug):
     logging.basicConfig(
-        level=logging.DEBUG if args.debug else logging.INFO,
+        level=logging.DEBUG if debug else logging.INFO,
         format="%(asctime)s %(message)s",
         datefmt="%Y/%m/%d %H:%M:%S",
     )
 
+def make_client(args):
+    if args.asyncio:
+        from aio_client import My_Async_Client
+        return My_Async_Client(args)
+    from client import My_Client
+    return My_Client(args)
+
+def main():
+    #get args
+    args = get_parser().parse_args()
+
+    #configure logging
+    configure_logging(args.debug)
+
+    #report where startup time goes
+    if args.profile_imports:
+        from startup import profile_imports
+        profile_imports(["aio_client" if args.asyncio else "client"])
+
     #check if dev_eui is empty
     if args.dev_eui == []:
         logging.error("[MAIN] Argument --dev_eui was not provided, no packets can be retrieved. Set the argument, to configure which devices to subcribe to. see --help or plugin documentation, Exiting...")
         exit(1)
 
+    #--spool-always writes to the spool, which needs a directory
+    if args.spool_always and not args.spool_dir:
+        logging.error("[MAIN] Argument --spool-always needs --spool-dir (or SPOOL_DIR), Exiting...")
+        exit(1)
+
+    #several processes: a supervisor runs one client per shard of the devices
+    if args.processes > 1:
+        from supervisor import Supervisor
+        Supervisor(args).run()
+        return
+
     #configure client
-    mqtt_client = My_Client(args)
+    mqtt_client = make_client(args)
     mqtt_client.run()
 
 if __name__ == "__main__":
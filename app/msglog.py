@@ -0,0 +1,29 @@
+import logging
+import time
+
+class PacketLog:
+    """
+    One INFO line per uplink: device, fCnt, number of parameters and decode time.
+    With an interval, at most one line per device is written every `interval` seconds and
+    the packets left out are counted in the next line. Formatting is left to logging.
+    """
+
+    def __init__(self, interval=0):
+        self.interval = interval
+        self.last = {}  # device -> (time of last line, packets not logged since)
+
+    def packet(self, device, fcnt, n_params, decode_seconds):
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        now = time.monotonic()
+        last, skipped = self.last.get(device, (0.0, 0))
+        if self.interval and now - last < self.interval:
+            self.last[device] = (last, skipped + 1)
+            return
+        self.last[device] = (now, 0)
+        if skipped:
+            logging.info("[MQTT CLIENT] uplink devEui=%s fCnt=%s params=%d decode=%.0fus (+%d not logged)",
+                         device, fcnt, n_params, decode_seconds * 1e6, skipped)
+        else:
+            logging.info("[MQTT CLIENT] uplink devEui=%s fCnt=%s params=%d decode=%.0fus",
+                         device, fcnt, n_params, decode_seconds * 1e6)
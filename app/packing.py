@@ -0,0 +1,108 @@
+import argparse
+import base64
+import json
+import struct
+import sys
+import threading
+import time
+import zlib
+
+# Packed publishing formats, values are base64 strings with a leading format version byte.
+#   signal.rxinfo: one record per uplink, per gateway: gateway EUI (8 bytes), rssi (int16), snr * 4 (int16)
+#   raw_payload.batch: zlib of the uplinks of a window, per uplink: timestamp ns (int64), devEui (8 bytes),
+#                      fCnt (uint32), payload length (uint16), payload
+VERSION = 1
+RXINFO = struct.Struct('<8shh')
+RAW_HEADER = struct.Struct('<q8sIH')
+MISSING = -32768  # rssi/snr not reported
+
+def eui_bytes(eui):
+    try:
+        return bytes.fromhex(eui or '')[:8].rjust(8, b'\0')
+    except ValueError:
+        return bytes(8)
+
+def pack_rxinfo(rx_info):
+    """rssi/snr of every gateway that received the uplink, as Get_Signal_Performance_values returns them."""
+    data = bytearray([VERSION])
+    for gateway in rx_info:
+        rssi, snr = gateway.get("rssi"), gateway.get("snr")
+        data += RXINFO.pack(eui_bytes(gateway.get("gatewayId")),
+                            MISSING if rssi is None else int(rssi),
+                            MISSING if snr is None else round(snr * 4))
+    return base64.b64encode(bytes(data)).decode()
+
+def unpack_rxinfo(value):
+    data = base64.b64decode(value)
+    if data[0] != VERSION:
+        raise ValueError(f"Unknown rxinfo format version {data[0]}")
+    return [{"gatewayId": eui.hex(),
+             "rssi": None if rssi == MISSING else rssi,
+             "snr": None if snr == MISSING else snr / 4}
+            for eui, rssi, snr in RXINFO.iter_unpack(data[1:])]
+
+def unpack_raw_batch(value):
+    data = zlib.decompress(base64.b64decode(value))
+    if data[0] != VERSION:
+        raise ValueError(f"Unknown raw batch format version {data[0]}")
+    uplinks = []
+    index = 1
+    while index < len(data):
+        timestamp, dev_eui, fcnt, length = RAW_HEADER.unpack_from(data, index)
+        index += RAW_HEADER.size
+        uplinks.append({"timestamp": timestamp, "devEui": dev_eui.hex(), "fCnt": fcnt,
+                        "data": base64.b64encode(data[index:index + length]).decode()})
+        index += length
+    return uplinks
+
+class RawBatch:
+    """
+    Collects raw payloads for `window` seconds, then take() returns them as one compressed blob.
+    Pipeline workers add to the same batch.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.data = bytearray([VERSION])
+        self.count = 0
+        self.first_timestamp = None
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, timestamp, dev_eui, fcnt, payload):
+        with self.lock:
+            if self.count == 0:
+                self.started = time.monotonic()
+                self.first_timestamp = timestamp
+            self.data += RAW_HEADER.pack(timestamp, eui_bytes(dev_eui), fcnt or 0, len(payload))
+            self.data += payload
+            self.count += 1
+
+    def due(self):
+        return self.count > 0 and time.monotonic() - self.started >= self.window
+
+    def take(self):
+        """Returns (timestamp of the first uplink, number of uplinks, base64 zlib blob) and starts a new batch, None if empty."""
+        with self.lock:
+            if self.count == 0:
+                return None
+            batch = (self.first_timestamp, self.count, base64.b64encode(zlib.compress(bytes(self.data), 9)).decode())
+            self.data = bytearray([VERSION])
+            self.count = 0
+            return batch
+
+def main():
+    # Offline decoder for values published in packed mode, prints one JSON object per line
+    parser = argparse.ArgumentParser(description="Decode signal.rxinfo and raw_payload.batch values published with --packed")
+    parser.add_argument("kind", choices=["rxinfo", "raw"], help="signal.rxinfo or raw_payload.batch value")
+    parser.add_argument("value", nargs="?", help="published value, read from stdin (one per line) if omitted")
+    args = parser.parse_args()
+
+    unpack = unpack_rxinfo if args.kind == "rxinfo" else unpack_raw_batch
+    values = [args.value] if args.value else [line.strip() for line in sys.stdin if line.strip()]
+    for value in values:
+        for item in unpack(value):
+            print(json.dumps(item))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
 import json
 import logging
 import re
-from dateutil import parser
+from types import MappingProxyType
+from datetime import datetime, timezone
+from cache import TTLCache
+
+#pattern excepted 
+CLEAN_PATTERN = re.compile(r'[^a-z0-9_]')
+
+# devEui -> (fingerprint, frozen metadata), metadata of a device rarely changes between uplinks
+measurement_metadata_cache = TTLCache(ttl=24*3600)
+signal_metadata_cache = TTLCache(ttl=24*3600)
+
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 def parse_message_payload(payload_data):
 
@@ -9,7 +20,39 @@ def parse_message_payload(payload_data):
 
     return tmp_dict
 
+def metadata_fingerprint(message_dict):
+    """
+    Returns (devEui, fingerprint) of the fields metadata is built from,
+    or (None, None) if the message has no deviceInfo.
+    """
+    deviceInfo_dict = message_dict.get('deviceInfo', None)
+    if not isinstance(deviceInfo_dict, dict):
+        return None, None
+    tags_dict = deviceInfo_dict.get('tags', None) or {}
+    fingerprint = (message_dict.get('devAddr', None),
+                   tuple((k, v) for k, v in deviceInfo_dict.items() if k != 'tags'),
+                   tuple(tags_dict.items()))
+    return deviceInfo_dict.get('devEui', None), fingerprint
+
+def cached_metadata(cache, build, message_dict):
+    """
+    Returns the read-only metadata template built by build(message_dict), reusing the cached one
+    while the device's deviceInfo/tags are unchanged. Callers add per-measurement fields to a copy.
+    """
+    devEui, fingerprint = metadata_fingerprint(message_dict)
+    if devEui is not None:
+        cached = cache.get(devEui)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+    template = MappingProxyType(build(message_dict))
+    if devEui is not None:
+        cache.set(devEui, (fingerprint, template))
+    return template
+
 def Get_Measurement_metadata(message_dict):
+    return cached_metadata(measurement_metadata_cache, build_measurement_metadata, message_dict)
+
+def build_measurement_metadata(message_dict):
     tmp_dict = {}
 
     #Get static metadata
@@ -51,11 +94,8 @@ def clean_string(txt):
     #convert capital letters to lowercase
     txt = txt.lower()
 
-    #pattern excepted 
-    pattern = r'[^a-z0-9_]'
-
     #replace not excepted values with '_' in txt
-    txt = re.sub(pattern, '_', txt)
+    txt = CLEAN_PATTERN.sub('_', txt)
 
     return txt
 
@@ -92,6 +132,9 @@ def Get_Signal_Performance_values(message_dict):
     return tmp_dict
 
 def Get_Signal_Performance_metadata(message_dict):
+    return cached_metadata(signal_metadata_cache, build_signal_performance_metadata, message_dict)
+
+def build_signal_performance_metadata(message_dict):
     tmp_dict = {}
 
     #get values from nested dictionary
@@ -115,14 +158,14 @@ def Get_Signal_Performance_metadata(message_dict):
 
 
 def convert_time(iso_time):
-    # Parse the timestamp string using dateutil.parser
+    # Parse the timestamp string, fromisoformat accepts 'Z' and long fractions since python 3.11
     try:
-        datetime_obj = parser.isoparse(iso_time)
+        datetime_obj = datetime.fromisoformat(iso_time)
     except ValueError as e:
         logging.error(f"[Parser] Error: {e}")
-    else:
-        # Convert the datetime object to nanoseconds since the epoch
-        total_seconds = datetime_obj.timestamp()
-        nanoseconds = int(total_seconds * 1e9)
-
-    return nanoseconds
+        raise
+    if datetime_obj.tzinfo is None:
+        datetime_obj = datetime_obj.astimezone()  # naive times are local, as datetime.timestamp() assumes
+    # Convert the datetime object to nanoseconds since the epoch with integer arithmetic
+    delta = datetime_obj - EPOCH_UTC
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
@@ -0,0 +1,110 @@
+import threading
+import time
+from contextlib import nullcontext
+
+NULL_STAGE = nullcontext()  # returned when instrumentation is disabled, nothing is timed
+N_BUCKETS = 32  # power-of-two microsecond buckets, the last one holds anything >= ~35 minutes
+
+class Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.max = 0.0    # seconds
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        # bucket b holds durations in [2^(b-1), 2^b) microseconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), N_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        # upper bound (us) of the bucket holding the q-th percentile
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return float(1 << bucket)
+        return 0.0
+
+class Stage:
+    __slots__ = ("monitor", "name", "start")
+
+    def __init__(self, monitor, name):
+        self.monitor = monitor
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.monitor.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class PerfMonitor:
+    """
+    Rolling per-stage latency histograms for the message pipeline.
+    Stages are timed with `with monitor.stage("decode"):` and summarised every `interval` seconds
+    as plugin.perf.<stage>.<stat> values. An interval of 0 disables timing.
+    Pipeline workers share one monitor.
+    """
+
+    def __init__(self, interval=0):
+        self.interval = interval
+        self.enabled = interval > 0
+        self.histograms = {}
+        self.last_summary = time.monotonic()
+        self.lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name)
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def due(self):
+        return self.enabled and time.monotonic() - self.last_summary >= self.interval
+
+    def summary_if_due(self):
+        """Returns summary() if the interval has passed, else an empty list. Only one worker gets each window."""
+        if not self.due():
+            return []
+        with self.lock:
+            if not self.due():
+                return []  # another worker summarised it first
+            return self.summarise()
+
+    def summary(self):
+        """
+        Returns a list of (name, value, unit) for every stage seen since the last summary
+        and starts a new window.
+        """
+        with self.lock:
+            return self.summarise()
+
+    def summarise(self):
+        values = []
+        for name, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            prefix = f"plugin.perf.{name}"
+            values.append((f"{prefix}.count", histogram.count, "count"))
+            values.append((f"{prefix}.mean", round(histogram.total / histogram.count * 1e6, 1), "us"))
+            values.append((f"{prefix}.p50", histogram.percentile(50), "us"))
+            values.append((f"{prefix}.p99", histogram.percentile(99), "us"))
+            values.append((f"{prefix}.max", round(histogram.max * 1e6, 1), "us"))
+        self.histograms = {}
+        self.last_summary = time.monotonic()
+        return values
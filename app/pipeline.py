@@ -0,0 +1,93 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+class Message(NamedTuple):
+    # same attributes paho's MQTTMessage exposes to the client callbacks, plus when it was received
+    topic: str
+    payload: bytes
+    received: float = 0.0  # time.perf_counter() when the message was received
+
+def topic_dev_eui(topic):
+    # application/<application id>/device/<dev_eui>/event/<event>
+    parts = topic.split('/', 4)
+    return parts[3] if len(parts) > 3 and parts[2] == "device" else topic
+
+def topic_route(topic):
+    """
+    Returns (dev_eui, event) from a ChirpStack topic application/<id>/device/<dev_eui>/event/<event>.
+    Topics in any other format are assumed to carry uplinks, dev_eui is None for them.
+    """
+    parts = topic.split('/')
+    if len(parts) == 6 and parts[2] == "device" and parts[4] == "event":
+        return parts[3].lower(), parts[5]
+    return None, "up"
+
+class Pipeline:
+    """
+    Moves decode/publish work off paho's network thread.
+    The MQTT callback only calls submit(), which enqueues the message for one of `workers` threads.
+    Messages are sharded by dev_eui so each device is always handled by the same worker, in order.
+    With 0 workers messages are handled inline in the callback.
+    """
+
+    def __init__(self, handler, workers=1, max_queue=1000):
+        self.handler = handler
+        self.queues = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self.threads = []
+        self.dropped = 0  # messages dropped because a worker queue was full
+        self.handled_by = [0] * max(workers, 1)  # messages handled, per worker so threads never share a counter
+
+    def start(self):
+        for i, worker_queue in enumerate(self.queues):
+            thread = threading.Thread(target=self.worker, args=(i, worker_queue), name=f"pipeline-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logging.info(f"[PIPELINE] started {len(self.threads)} worker(s)")
+
+    def stop(self, timeout=10):
+        # let workers drain what is already queued
+        for worker_queue in self.queues:
+            worker_queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def submit(self, topic, payload):
+        """Queue a received message, returns False if it had to be dropped."""
+        message = Message(topic, payload, time.perf_counter())
+        if not self.queues:
+            self.handle(0, message)
+            return True
+        worker_queue = self.queues[zlib.crc32(topic_dev_eui(topic).encode()) % len(self.queues)]
+        try:
+            worker_queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logging.warning(f"[PIPELINE] worker queue full, dropped {self.dropped} message(s) so far")
+            return False
+        return True
+
+    def depth(self):
+        return sum(worker_queue.qsize() for worker_queue in self.queues)
+
+    def handled(self):
+        return sum(self.handled_by)
+
+    def worker(self, index, worker_queue):
+        while True:
+            message = worker_queue.get()
+            if message is None:
+                break
+            self.handle(index, message)
+
+    def handle(self, index, message):
+        self.handled_by[index] += 1
+        try:
+            self.handler(message)
+        except Exception as e:
+            logging.error(f"[PIPELINE] Failed to handle message from {message.topic}: {e}")
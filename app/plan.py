@@ -0,0 +1,35 @@
+from parse import clean_string
+from decoder import SAMPLING_PERIOD, HEARTBEAT
+
+# measurements the client adds besides the decoder's env.* parameters
+FIXED_NAMES = ("device_id", "version", "raw_payload", SAMPLING_PERIOD.topic, HEARTBEAT.topic)
+
+class PublishPlan:
+    """
+    Publish decisions per measurement name, computed once for a lookup table and
+    --collect/--ignore filters: name -> (publish?, cleaned topic name).
+    Names of every parameter in the lookup table are precomputed, unknown ones are added on first use.
+    """
+
+    def __init__(self, lookup, collect, ignore):
+        self.lookup = lookup
+        self.collect = frozenset(collect)
+        self.ignore = frozenset(ignore)
+        self.entries = {}
+        self.parameters = {param.topic: param for param in lookup.values()}  # measurement name -> Parameter
+        for name in FIXED_NAMES:
+            self.entry(name)
+        for param in lookup.values():
+            self.entry(param.topic)
+
+    def entry(self, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            # Skip the measurement if it's in the ignore list, if collect is not empty only publish measurements in it
+            publish = name not in self.ignore and (not self.collect or name in self.collect)
+            entry = self.entries[name] = (publish, clean_string(name))
+        return entry
+
+    def parameter(self, name):
+        # Parameter of a decoded measurement, None for names that are not in the lookup table
+        return self.parameters.get(name)
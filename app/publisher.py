@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import deque
+
+class Publisher:
+    """
+    Keeps a single waggle Plugin session open for the life of the process.
+    Measurements are queued per packet and published together on flush().
+    If the session fails it is closed and re-opened on the next flush.
+    With a spool, measurements that could not be published are written to disk and
+    replayed in order once publishing works again: a chunk per flush() and the rest by a
+    background drain thread. The spool lock is only held to read a chunk and to record how far
+    it was published, never while it is sent, so a long replay does not hold up publish().
+    With spool_always every measurement goes through the spool.
+    The queue lock is only held to add or take measurements, never while publishing, so
+    publish() does not wait for the network and several flush() calls can publish at once.
+    """
+
+    def __init__(self, max_queue=1000, reopen_delay=5, spool=None, spool_always=False, drain_interval=30, drain_chunk=500):
+        if spool_always and spool is None:
+            raise ValueError("spool_always needs a spool")
+        self.queue = deque(maxlen=max_queue)  # oldest measurements are dropped when full
+        self.reopen_delay = reopen_delay  # seconds to wait before re-opening a failed session
+        self.plugin = None
+        self.last_failure = 0
+        self.dropped = 0
+        self.lock = threading.Lock()  # pipeline workers share the queue
+        self.session_lock = threading.RLock()  # open/close of the plugin session
+        self.spool_lock = threading.Lock()  # the spool is not thread-safe
+        self.spool = spool
+        self.spool_always = spool_always
+        self.drain_interval = drain_interval  # seconds between background drains of the spool
+        self.drain_chunk = drain_chunk  # spooled measurements replayed per hold of the spool lock
+        self.drain_lock = threading.Lock()  # one drain at a time, other flushes don't wait for it
+        self.stopped = threading.Event()
+        self.drain_thread = None
+
+    def open(self):
+        if self.plugin is not None:
+            return True
+        with self.session_lock:
+            if self.plugin is not None:
+                return True
+            if time.monotonic() - self.last_failure < self.reopen_delay:
+                return False
+            try:
+                from waggle.plugin import Plugin # imported on first publish, not at startup
+                plugin = Plugin()
+                plugin.__enter__()
+            except Exception as e:
+                self.last_failure = time.monotonic()
+                logging.error(f"[PUBLISHER] Failed to open plugin session: {str(e)}")
+                return False
+            self.plugin = plugin
+        logging.debug("[PUBLISHER] Plugin session opened")
+        return True
+
+    def close(self):
+        with self.session_lock:
+            if self.plugin is None:
+                return
+            try:
+                self.plugin.__exit__(None, None, None)
+            except Exception as e:
+                logging.error(f"[PUBLISHER] Error closing plugin session: {str(e)}")
+            self.plugin = None
+        logging.debug("[PUBLISHER] Plugin session closed")
+
+    def publish(self, name, value, timestamp, meta, extra=None):
+        """Queue a measurement, it is sent on the next flush(). extra is merged into a copy of meta."""
+        meta = dict(meta)
+        if extra:
+            meta.update(extra)
+        if self.spool_always:
+            with self.spool_lock:
+                self.spool.append([(name, value, timestamp, meta)])
+            return
+        with self.lock:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+                logging.warning(f"[PUBLISHER] Queue full, dropping oldest measurement ({self.dropped} dropped so far)")
+            self.queue.append((name, value, timestamp, meta))
+
+    def flush(self):
+        """Publish every queued measurement. Returns the number published."""
+        with self.lock:
+            batch = list(self.queue)
+            self.queue.clear()
+        return self.publish_batch(batch)
+
+    def publish_batch(self, batch):
+        if self.spool is not None:
+            with self.spool_lock:
+                spooled = self.spool.pending() or not self.open()
+                if spooled:
+                    # keep order: new measurements go behind what is already spooled
+                    self.spool.append(batch)
+            if spooled:
+                return self.drain_spool(chunks=1)
+        if not batch:
+            return 0
+        if not self.open():
+            self.requeue(batch)
+            return 0
+        for published, (name, value, timestamp, meta) in enumerate(batch):
+            try:
+                self.send(name, value, timestamp, meta)
+            except Exception as e:
+                # keep the measurement queued (or spooled) and re-open the session on the next flush
+                logging.error(f"[PUBLISHER] measurement {name} did not publish encountered an error: {str(e)}")
+                self.fail()
+                if self.spool is not None:
+                    with self.spool_lock:
+                        self.spool.append(batch[published:])
+                else:
+                    self.requeue(batch[published:])
+                return published
+        return len(batch)
+
+    def requeue(self, batch):
+        # put measurements that could not be published back in front of the queue, oldest are dropped when full
+        with self.lock:
+            room = self.queue.maxlen - len(self.queue)
+            if len(batch) > room:
+                self.dropped += len(batch) - room
+                logging.warning(f"[PUBLISHER] Queue full, dropping oldest measurement ({self.dropped} dropped so far)")
+                batch = batch[len(batch) - room:] if room > 0 else []
+            self.queue.extendleft(reversed(batch))
+
+    def send(self, name, value, timestamp, meta):
+        self.plugin.publish(name, value, timestamp=timestamp, meta=meta)
+        logging.debug("[PUBLISHER] %s published", name)
+
+    def fail(self):
+        self.last_failure = time.monotonic()
+        self.close()
+
+    def drain_spool(self, chunks=None):
+        """Replays up to `chunks` chunks of spooled measurements (all if None), returns the number published."""
+        if not self.drain_lock.acquire(blocking=False):
+            return 0  # another thread is draining
+        published = 0
+        try:
+            while chunks is None or chunks > 0:
+                if not self.open():
+                    break
+                with self.spool_lock:
+                    chunk = self.spool.read(self.drain_chunk) if self.spool.pending() else []
+                if not chunk:
+                    break
+                sent, failed = None, False
+                for record, cursor in chunk:
+                    try:
+                        if record is not None:
+                            self.send(*record)
+                            published += 1
+                    except Exception as e:
+                        logging.error(f"[PUBLISHER] spooled measurement did not publish encountered an error: {str(e)}")
+                        self.fail()
+                        failed = True
+                        break
+                    sent = cursor
+                if sent is not None: # what was sent stays published, the rest stays spooled
+                    with self.spool_lock:
+                        self.spool.commit(sent)
+                if failed:
+                    break
+                if chunks is not None:
+                    chunks -= 1
+        finally:
+            self.drain_lock.release()
+        if published and chunks is None:
+            logging.info(f"[PUBLISHER] {published} spooled measurement(s) published")
+        return published
+
+    def start_drain(self):
+        if self.spool is None or self.drain_thread is not None:
+            return
+        self.drain_thread = threading.Thread(target=self.drain_loop, name="spool-drain", daemon=True)
+        self.drain_thread.start()
+
+    def drain_loop(self):
+        # replay spooled measurements even when no new uplinks arrive, and fsync the last ones spooled
+        next_drain = time.monotonic() + self.drain_interval
+        while not self.stopped.wait(min(self.spool.fsync_interval, self.drain_interval)):
+            with self.spool_lock:
+                self.spool.sync_if_due()
+            if time.monotonic() >= next_drain:
+                next_drain = time.monotonic() + self.drain_interval
+                self.drain_spool()
+
+    def __enter__(self):
+        self.start_drain()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.flush()
+        with self.spool_lock:
+            if self.spool is not None:
+                self.spool.close()
+        self.close()
@@ -0,0 +1,74 @@
+import importlib
+import json
+import logging
+import threading
+
+DEFAULT_CLASS = "decoder:Decoder"
+SPEC_ATTRIBUTES = {"timezone": "sensor_timezone", "utc": "sensor_time_is_utc", "range_action": "range_action"}
+
+class DecoderRegistry:
+    """
+    Decoder per device: its devEui is looked up first, then its deviceProfileName, then the default decoder.
+    Decoders are configured as specs {"class": "module:Class", "timezone": ..., "utc": ..., "range_action": ..., <constructor kwargs>}
+    and only created on the first packet that needs them. Devices mapped to the same spec share the instance.
+    `defaults` are attributes set on every decoder unless its spec has its own value.
+    """
+
+    def __init__(self, decoders=None, devices=None, profiles=None, default="default", defaults=None):
+        self.specs = dict(decoders) if decoders else {"default": {}}
+        self.devices = {dev_eui.lower(): name for dev_eui, name in (devices or {}).items()}  # devEui -> decoder name
+        self.profiles = dict(profiles or {})  # deviceProfileName -> decoder name
+        self.default = default or None  # None drops devices that are not mapped
+        self.defaults = dict(defaults or {})  # attribute -> value
+        self.instances = {}  # decoder name -> decoder, filled on first use
+        self.lock = threading.Lock()  # pipeline workers may ask for the same decoder at once
+
+        unknown = {name for name in (*self.devices.values(), *self.profiles.values(), self.default)
+                   if name is not None and name not in self.specs}
+        if unknown:
+            raise ValueError(f"Decoder(s) not defined: {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def from_file(cls, path, defaults=None):
+        """
+        Load the registry from a JSON file:
+            {"decoders": {"exo": {"class": "decoder:Decoder", "csv_file": "./parameters.csv", "timezone": "America/Chicago"}},
+             "devices": {"<devEui>": "exo"}, "profiles": {"<deviceProfileName>": "exo"}, "default": "exo"}
+        Without "default", uplinks of devices that are not mapped are dropped.
+        """
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config.get("decoders"), config.get("devices"), config.get("profiles"), config.get("default"), defaults)
+
+    def name(self, dev_eui=None, profile=None):
+        # two dict lookups, whatever the number of devices and profiles
+        name = self.devices.get(dev_eui.lower()) if dev_eui else None
+        if name is None:
+            name = self.profiles.get(profile, self.default)
+        return name
+
+    def get(self, dev_eui=None, profile=None):
+        """Returns the decoder for a device, or None if it is not mapped and there is no default."""
+        name = self.name(dev_eui, profile)
+        if name is None:
+            return None
+        decoder = self.instances.get(name)
+        if decoder is None:
+            with self.lock:
+                decoder = self.instances.get(name)
+                if decoder is None:
+                    decoder = self.instances[name] = self.create(name)
+        return decoder
+
+    def create(self, name):
+        spec = dict(self.specs[name])
+        module_name, _, class_name = spec.pop("class", DEFAULT_CLASS).partition(":")
+        attributes = dict(self.defaults)
+        for key, attribute in SPEC_ATTRIBUTES.items():
+            if key in spec:
+                attributes[attribute] = spec.pop(key)
+        decoder = getattr(importlib.import_module(module_name), class_name)(**spec)
+        for attribute, value in attributes.items():
+            setattr(decoder, attribute, value)
+        logging.info(f"[DECODERS] loaded decoder '{name}' ({module_name}:{class_name})")
+        return decoder
@@ -0,0 +1,171 @@
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from main import get_parser
+from client import My_Client
+from perf import Stage
+from pipeline import Message
+
+class StubPublisher:
+    """
+    Stands in for Publisher during replay: measurements are counted instead of sent to Beehive.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, name, value, timestamp, meta, extra=None):
+        meta = dict(meta)
+        if extra:
+            meta.update(extra)
+        self.queue.append((name, value, timestamp, meta))
+
+    def flush(self):
+        published = len(self.queue)
+        self.published += published
+        self.queue.clear()
+        return published
+
+    def close(self):
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+class StageTimer:
+    """
+    Takes the place of My_Client.perf and keeps every stage duration (seconds)
+    so exact percentiles can be reported.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def stage(self, name):
+        return Stage(self, name)
+
+    def record(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def summary_if_due(self):
+        return []
+
+def read_messages(path):
+    """
+    Read recorded uplinks, one JSON object per line. A line is either a ChirpStack uplink event
+    or {"topic": ..., "payload": <uplink event>} when the MQTT topic was recorded too.
+    """
+    messages = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "topic" in record and "payload" in record:
+                topic = record["topic"]
+                payload = record["payload"] if isinstance(record["payload"], str) else json.dumps(record["payload"])
+            else:
+                device_info = record.get("deviceInfo", {})
+                topic = f"application/{device_info.get('applicationId')}/device/{device_info.get('devEui')}/event/up"
+                payload = line
+            messages.append(Message(topic, payload.encode("utf-8")))
+    return messages
+
+def percentile(samples, q):
+    # nearest-rank percentile
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def measure_allocations(mqtt_client, messages):
+    """Returns (mean peak bytes, mean net allocated blocks) per message."""
+    peak_bytes = 0
+    net_blocks = 0
+    tracemalloc.start()
+    for message in messages:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        mqtt_client.publish_message(None, None, message)
+        net_blocks += sys.getallocatedblocks() - blocks
+        peak_bytes += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return peak_bytes / len(messages), net_blocks / len(messages)
+
+def report(timer, totals, elapsed, n_messages, published, allocations=None):
+    print(f"messages: {n_messages}  published measurements: {published}")
+    print(f"throughput: {n_messages / elapsed:.1f} msgs/sec")
+    print(f"{'stage':<10} {'calls':>7} {'p50 (us)':>10} {'p99 (us)':>10}")
+    stages = list(timer.samples.items()) + [("total", totals)]
+    for stage, samples in stages:
+        print(f"{stage:<10} {len(samples):>7} {percentile(samples, 50) * 1e6:>10.1f} {percentile(samples, 99) * 1e6:>10.1f}")
+    if allocations:
+        peak_bytes, net_blocks = allocations
+        print(f"allocations: {peak_bytes:.0f} peak bytes/msg, {net_blocks:.1f} net blocks/msg")
+
+def main():
+    parser = get_parser()
+    parser.description = "Replay recorded ChirpStack uplinks through parse, decode, filter and publish without a broker"
+    parser.add_argument("file", help="file with one recorded uplink JSON per line")
+    parser.add_argument("--repeat", default=1, type=int, help="number of times to replay the file")
+    parser.add_argument("--allocations", action="store_true", default=False, help="also measure allocations per message (slower, separate pass)")
+    parser.add_argument(
+        "--check-timestamp-age",
+        action="store_true",
+        default=False,
+        help="keep the sensor timestamp age check, recorded packets are usually older than its tolerance",
+    )
+    # repeated passes replay the same uplinks, don't let deduplication drop them unless asked to
+    parser.set_defaults(dedup_ttl=0)
+    args = parser.parse_args()
+
+    # log output is left out of the measurement unless --debug is set
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.WARNING,
+        format="%(asctime)s %(message)s",
+        datefmt="%Y/%m/%d %H:%M:%S",
+    )
+
+    messages = read_messages(args.file)
+    if not messages:
+        logging.error(f"[REPLAY] No messages found in {args.file}")
+        exit(1)
+
+    mqtt_client = My_Client(args)
+    mqtt_client.publisher = StubPublisher()
+    if not args.check_timestamp_age:
+        mqtt_client.is_packet_time_utc = lambda *a, **kw: None
+
+    # warm up caches before measuring
+    for message in messages:
+        mqtt_client.publish_message(None, None, message)
+    allocations = measure_allocations(mqtt_client, messages) if args.allocations else None
+    mqtt_client.publisher.published = 0
+
+    timer = StageTimer()
+    mqtt_client.perf = timer
+    totals = []
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for message in messages:
+            t0 = time.perf_counter()
+            mqtt_client.publish_message(None, None, message)
+            totals.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    report(timer, totals, elapsed, len(totals), mqtt_client.publisher.published, allocations)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import time
+
+class Spool:
+    """
+    Append-only on-disk spool of measurements, kept as numbered segment files of JSON lines
+    ([name, value, timestamp, meta] per line). Every append is written to the file, fsyncs are batched
+    every `fsync_interval` seconds by append() or sync_if_due(). read() returns records oldest first
+    and commit() remembers how far they were published in a small cursor file.
+    When the spool grows past `max_size` bytes the oldest segments are evicted.
+    Not thread-safe, the owner (Publisher) serialises access.
+    """
+
+    def __init__(self, directory, max_size=100*1024*1024, segment_size=1024*1024, fsync_interval=5):
+        self.directory = directory
+        self.max_size = max_size
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval  # seconds between fsyncs of the active segment
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.segments = sorted(int(f.split('.')[0]) for f in os.listdir(self.directory) if f.endswith(".spool"))
+        self.sizes = {seq: os.path.getsize(self.segment_path(seq)) for seq in self.segments}
+        self.read_segment, self.read_offset = self.load_cursor()
+        self.writer = None
+        self.last_fsync = time.monotonic()
+        self.unsynced = False  # appended since the last fsync
+        self.open_segment(self.segments[-1] if self.segments else 0)
+        if self.pending():
+            logging.info(f"[SPOOL] {self.size()} bytes spooled in {self.directory} waiting to be published")
+
+    def segment_path(self, seq):
+        return os.path.join(self.directory, f"{seq:010d}.spool")
+
+    def cursor_path(self):
+        return os.path.join(self.directory, "cursor")
+
+    def load_cursor(self):
+        try:
+            with open(self.cursor_path()) as f:
+                cursor = json.load(f)
+            if cursor["segment"] in self.sizes:
+                return cursor["segment"], cursor["offset"]
+        except (OSError, ValueError, KeyError) as e:
+            logging.debug(f"[SPOOL] no usable cursor: {e}")
+        return (self.segments[0] if self.segments else 0), 0
+
+    def save_cursor(self):
+        # atomic replace so a crash never leaves a half written cursor
+        tmp = self.cursor_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": self.read_segment, "offset": self.read_offset}, f)
+        os.replace(tmp, self.cursor_path())
+
+    def open_segment(self, seq):
+        if self.writer is not None:
+            self.sync()
+            self.writer.close()
+        self.writer = open(self.segment_path(seq), "ab")
+        self.write_segment = seq
+        if seq not in self.sizes:
+            self.segments.append(seq)
+            self.sizes[seq] = 0
+
+    def size(self):
+        return sum(self.sizes.values())
+
+    def pending(self):
+        return len(self.segments) > 1 or self.read_offset < self.sizes.get(self.write_segment, 0)
+
+    def append(self, records):
+        """Spool (name, value, timestamp, meta) records."""
+        for name, value, timestamp, meta in records:
+            line = (json.dumps([name, value, timestamp, meta], separators=(',', ':')) + "\n").encode("utf-8")
+            self.writer.write(line)
+            self.sizes[self.write_segment] += len(line)
+            if self.sizes[self.write_segment] >= self.segment_size:
+                self.open_segment(self.write_segment + 1)
+        self.writer.flush()  # out of the process buffer, a crash of the process loses nothing
+        self.unsynced = True
+        self.sync_if_due()
+        self.evict()
+
+    def sync_if_due(self):
+        # fsync what was appended once fsync_interval passed, called on appends and by the owner's timer
+        if self.unsynced and time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        self.last_fsync = time.monotonic()
+        self.unsynced = False
+
+    def evict(self):
+        # drop oldest segments first, the active one is never evicted
+        while self.size() > self.max_size and len(self.segments) > 1:
+            seq = self.segments.pop(0)
+            logging.warning(f"[SPOOL] spool over {self.max_size} bytes, evicting {self.sizes[seq]} bytes of oldest measurements")
+            self.remove_segment(seq)
+
+    def remove_segment(self, seq):
+        self.sizes.pop(seq, None)
+        try:
+            os.remove(self.segment_path(seq))
+        except OSError as e:
+            logging.error(f"[SPOOL] Could not remove {self.segment_path(seq)}: {e}")
+        if self.read_segment == seq:
+            self.read_segment, self.read_offset = self.segments[0], 0
+            self.save_cursor()
+
+    def read(self, limit):
+        """
+        Returns up to `limit` spooled records, oldest first, as [(record, cursor after it)] without consuming them.
+        Corrupt records come back as None so their cursor can be committed past them.
+        """
+        self.writer.flush()  # make the active segment readable
+        records = []
+        seq, offset = self.read_segment, self.read_offset
+        while True:
+            with open(self.segment_path(seq), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if len(records) >= limit:
+                        return records
+                    if not line.endswith(b"\n"):
+                        break  # partially written record
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        logging.error(f"[SPOOL] Skipping corrupt record in {self.segment_path(seq)}: {e}")
+                        record = None
+                    records.append((record, (seq, offset)))
+            if seq == self.write_segment:
+                return records
+            # the rest of the records are in the next segment
+            seq, offset = self.segments[self.segments.index(seq) + 1], 0
+
+    def commit(self, cursor):
+        """Marks the records read up to `cursor` as published, segments drained before it are removed."""
+        seq, offset = cursor
+        if seq not in self.sizes:
+            return  # evicted while it was being published
+        while self.segments[0] != seq:
+            self.remove_segment(self.segments.pop(0))
+        self.read_segment, self.read_offset = seq, offset
+        if offset >= self.sizes[seq] and seq != self.write_segment:
+            self.segments.pop(0)
+            self.remove_segment(seq)
+        self.save_cursor()
+
+    def close(self):
+        if self.writer is not None:
+            self.sync()
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,42 @@
+import logging
+import os
+import subprocess
+import sys
+
+def import_times(modules):
+    """
+    Imports `modules` in a fresh interpreter with python's -X importtime and returns
+    [(module, self us, cumulative us, depth)] in import order.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = []
+    for line in result.stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <2 spaces per level><module>
+        fields = line.split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), int(fields[0].split(":")[1]), int(fields[1]), depth))
+    return times
+
+def profile_imports(modules, top=15):
+    """Logs the import time of `modules` and the slowest imports they pull in."""
+    try:
+        times = import_times(modules)
+    except RuntimeError as e:
+        logging.error(f"[STARTUP] Could not profile imports of {', '.join(modules)}: {e}")
+        return
+    for name, self_us, cumulative_us, depth in times:
+        if name in modules:
+            logging.info(f"[STARTUP] import {name}: {cumulative_us / 1000:.1f} ms")
+    logging.info("[STARTUP] slowest imports (self time):")
+    for name, self_us, cumulative_us, depth in sorted(times, key=lambda t: t[1], reverse=True)[:top]:
+        logging.info(f"[STARTUP]   {name}: {self_us / 1000:.1f} ms (with its imports {cumulative_us / 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    profile_imports(sys.argv[1:] or ["client"])
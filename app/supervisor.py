@@ -0,0 +1,169 @@
+import bisect
+import copy
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from publisher import Publisher
+
+RESTART_DELAY = 5  # seconds before a worker process that exited is started again
+STOP_TIMEOUT = 8  # seconds workers get to publish what they hold on shutdown, within docker's default 10s
+
+class HashRing:
+    """
+    Consistent hashing of dev_euis onto worker indices. Each worker owns `replicas` points on the ring,
+    so changing the number of workers only moves the devices of the ring segments that changed owner.
+    """
+
+    def __init__(self, workers, replicas=64):
+        self.count = workers
+        points = sorted((zlib.crc32(f"worker-{worker}-{replica}".encode()), worker)
+                        for worker in range(workers) for replica in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.workers = [worker for _, worker in points]
+
+    def worker(self, dev_eui):
+        index = bisect.bisect(self.hashes, zlib.crc32(dev_eui.lower().encode())) % len(self.hashes)
+        return self.workers[index]
+
+    def split(self, dev_euis):
+        shards = [[] for _ in range(self.count)]
+        for dev_eui in dev_euis:
+            shards[self.worker(dev_eui)].append(dev_eui)
+        return shards
+
+def run_worker(index, args, reports, interval):
+    """Worker process: one client for its share of the dev_euis, reporting its health every `interval` seconds."""
+    from main import configure_logging, make_client
+    configure_logging(args.debug)
+    client = make_client(args)
+
+    def report():
+        while True:
+            time.sleep(interval)
+            try:
+                reports.put_nowait((index, os.getpid(), client.health()))
+            except queue.Full:
+                pass
+
+    threading.Thread(target=report, name="health-report", daemon=True).start()
+    logging.info(f"[SUPERVISOR] worker {index} (pid {os.getpid()}) handling {len(args.dev_eui)} device(s)")
+    client.run()
+
+class Supervisor:
+    """
+    Runs one client process per shard of --dev_eui, so decoding is spread over CPU cores.
+    Devices are assigned with consistent hashing: every uplink of a device goes to the same process,
+    which owns its packet loss state. Workers report their counters, the supervisor publishes
+    the totals (plugin.supervisor.*) and restarts workers that exit.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.interval = args.health_interval
+        self.context = multiprocessing.get_context("spawn")  # no paho/waggle state is inherited from the parent
+        self.reports = self.context.Queue(maxsize=1000)
+        self.shards = [shard for shard in HashRing(args.processes).split(args.dev_eui) if shard]
+        self.processes = [None] * len(self.shards)
+        self.started = [0.0] * len(self.shards)
+        self.health = [None] * len(self.shards)  # last report per worker: (time received, counters)
+        self.restarts = 0
+        self.last_handled = None  # (time, total handled) at the last summary
+
+    def start_worker(self, index):
+        worker_args = copy.copy(self.args)
+        worker_args.dev_eui = self.shards[index]
+        if self.args.plr_state: # each worker saves the packet loss state of its own devices
+            worker_args.plr_state = f"{self.args.plr_state}.{index}"
+        process = self.context.Process(target=run_worker, args=(index, worker_args, self.reports, self.interval),
+                                       name=f"worker-{index}", daemon=True)
+        process.start()
+        self.processes[index] = process
+        self.started[index] = time.monotonic()
+        self.health[index] = None
+
+    def check_workers(self):
+        for index, process in enumerate(self.processes):
+            if process.is_alive() or time.monotonic() - self.started[index] < RESTART_DELAY:
+                continue
+            logging.error(f"[SUPERVISOR] worker {index} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+            self.restarts += 1
+            self.start_worker(index)
+
+    def collect(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                index, pid, counters = self.reports.get(timeout=remaining)
+            except queue.Empty:
+                return
+            if pid == self.processes[index].pid:  # ignore late reports of a replaced process
+                self.health[index] = (time.monotonic(), counters)
+
+    def summary(self):
+        """Returns (name, value, unit) totals across workers."""
+        now = time.monotonic()
+        alive = [health for process, health in zip(self.processes, self.health)
+                 if process.is_alive() and health is not None and now - health[0] < 3 * self.interval]
+        totals = {}
+        for _, counters in alive:
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        handled = totals.get("handled", 0)
+        throughput = 0.0
+        if self.last_handled is not None and now > self.last_handled[0]:
+            throughput = max(handled - self.last_handled[1], 0) / (now - self.last_handled[0])
+        self.last_handled = (now, handled)
+        values = [("plugin.supervisor.workers", len(alive), "count"),
+                  ("plugin.supervisor.restarts", self.restarts, "count"),
+                  ("plugin.supervisor.throughput", round(throughput, 2), "msgs/sec")]
+        values.extend((f"plugin.supervisor.{name}", value, "count") for name, value in sorted(totals.items()))
+        return values
+
+    def report(self, publisher):
+        values = self.summary()
+        logging.info("[SUPERVISOR] " + ", ".join(f"{name.rsplit('.', 1)[-1]}={value}" for name, value, _ in values))
+        if publisher is None:
+            return
+        timestamp = time.time_ns()
+        for name, value, unit in values:
+            publisher.publish(name, value, timestamp, {"unit": unit})
+        publisher.flush()
+
+    def run(self):
+        logging.info(f"[SUPERVISOR] starting {len(self.shards)} worker process(es) for {len(self.args.dev_eui)} device(s)")
+        for index in range(len(self.shards)):
+            self.start_worker(index)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # stop the workers when the container stops
+        publisher = None if self.args.dry else Publisher()  # dry-run: totals are only logged
+        try:
+            with publisher or nullcontext():
+                while True:
+                    self.collect(self.interval)
+                    self.check_workers()
+                    self.report(publisher)
+        finally:
+            self.stop_workers()
+
+    def stop_workers(self):
+        # SIGTERM first: workers publish what they hold back and save their state, then exit
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                logging.warning(f"[SUPERVISOR] worker {index} (pid {process.pid}) did not stop in {STOP_TIMEOUT}s, killing it")
+                process.kill()
+                process.join(1)
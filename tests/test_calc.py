@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from calc import PacketLossCalculator, MAX_FCNT_GAP, WINDOW
+
+def test_fcnt_diff():
+    assert PacketLossCalculator.fcnt_diff(10, 11) == 1
+    assert PacketLossCalculator.fcnt_diff(10, 10) == 0
+    assert PacketLossCalculator.fcnt_diff(10, 7) == -3  # reordered
+    assert PacketLossCalculator.fcnt_diff(65535, 1) == 2  # 16 bit rollover
+    assert PacketLossCalculator.fcnt_diff(2**32 - 1, 0) == 1  # 32 bit rollover
+    assert PacketLossCalculator.fcnt_diff(10, 10 + MAX_FCNT_GAP + 1) is None  # device reset
+    assert PacketLossCalculator.fcnt_diff(1000, 1000 - WINDOW) is None
+
+def test_loss_duplicates_and_late_arrivals():
+    calc = PacketLossCalculator(3600)
+    assert calc.process_packet("dev", 10) == (0, None)
+    assert calc.process_packet("dev", 13) == (2, None)  # 11 and 12 missing
+    assert calc.process_packet("dev", 13) == (0, None)  # duplicate through another gateway
+    assert calc.process_packet("dev", 12) == (0, None)  # late arrival
+    device = calc.devices["dev"]
+    assert (device.fCnt, device.totalpl, device.pckcount, device.late) == (13, 1, 3, 1)
+    assert calc.process_packet("dev", 12) == (0, None)  # late arrival seen again is a duplicate
+    assert device.pckcount == 3
+
+def test_plr_interval():
+    calc = PacketLossCalculator(0)  # every packet ends an interval
+    assert calc.process_packet("dev", 1) == (0, 0.0)
+    assert calc.process_packet("dev", 5) == (3, 75.0)  # 1 received, 3 lost
+    assert calc.process_packet("dev", 6) == (0, 0.0)
+
+def test_rejoin_restarts_fcnt():
+    calc = PacketLossCalculator(3600)
+    for fCnt in range(20):
+        calc.process_packet("dev", fCnt)
+    calc.reset("dev")
+    assert calc.process_packet("dev", 0) == (0, None)
+    assert calc.process_packet("dev", 1) == (0, None)
+    device = calc.devices["dev"]
+    assert (device.fCnt, device.pckcount, device.totalpl) == (1, 22, 0)
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "plr.json")
+    calc = PacketLossCalculator(3600)
+    calc.process_packet("dev", 10)
+    calc.process_packet("dev", 13)
+    assert calc.save(path)
+    assert not calc.save(path)  # unchanged since the last save
+
+    restored = PacketLossCalculator(3600)
+    assert restored.load(path) == 1
+    assert restored.process_packet("dev", 13) == (0, None)  # already received before the restart
+    assert restored.process_packet("dev", 15) == (1, None)
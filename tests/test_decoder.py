@@ -0,0 +1,120 @@
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+pytest.importorskip("crcmod")
+np = pytest.importorskip("numpy")
+
+from decoder import Decoder, packet_wall_seconds, SAMPLING_PERIOD, HEARTBEAT, NS_PER_SECOND, RANGE_ACTIONS
+
+DROP = RANGE_ACTIONS.index("drop")
+
+QUALITY = {RANGE_ACTIONS.index("off"): None, RANGE_ACTIONS.index("flag"): "out_of_range", RANGE_ACTIONS.index("clamp"): "clamped"}  # decode_batch quality index -> decode_ns tag
+
+def packet(decoder, records, date=240421.0, clock=134452.0, device_id=18):
+    """EXO packet from (code, status, value) records, (0, value) and (255, value) for the short ones."""
+    body = bytearray([0, 0, device_id]) + struct.pack("<ff", date, clock)
+    for record in records:
+        if record[0] == 0:
+            body += bytes([0]) + record[1].to_bytes(2, "little")
+        elif record[0] == 255:
+            body += bytes([255, record[1]])
+        else:
+            body += struct.pack("<BBf", *record)
+    return bytes(body) + bytes([decoder.crc8_func(bytes(body))])
+
+def reference_seconds(date, clock, zone=None):
+    # the strptime conversion packet_wall_seconds replaced
+    naive = datetime.strptime(f"{int(date):06d}-{int(clock):06d}", "%d%m%y-%H%M%S")
+    return int(naive.replace(tzinfo=ZoneInfo(zone) if zone else timezone.utc).timestamp())
+
+def test_packet_wall_seconds_matches_strptime():
+    for date in (10170.0, 311299.0, 290224.0, 280223.0, 10100.0, 311268.0, 10169.0, 150625.0):
+        for clock in (0.0, 134452.0, 235959.0):
+            assert packet_wall_seconds(date, clock) == reference_seconds(date, clock)
+
+@pytest.mark.parametrize("date, clock", [
+    (290223.0, 0.0),  # not a leap year
+    (310425.0, 0.0),
+    (1025.0, 0.0),  # day 0
+    (11325.0, 0.0),  # month 13
+    (10125.0, 246000.0),
+    (10125.0, 126000.0),
+    (10125.0, 120060.0),
+    (float("nan"), 0.0),
+    (10125.0, float("inf")),
+])
+def test_packet_wall_seconds_rejects_invalid(date, clock):
+    with pytest.raises(ValueError):
+        packet_wall_seconds(date, clock)
+
+@pytest.mark.parametrize("zone, date, clock", [
+    ("America/Chicago", 140321.0, 15959.0),  # before the spring gap
+    ("America/Chicago", 140321.0, 23000.0),  # inside the gap
+    ("America/Chicago", 140321.0, 30000.0),
+    ("America/Chicago", 71121.0, 5959.0),
+    ("America/Chicago", 71121.0, 13000.0),  # repeated hour, first occurrence as strptime
+    ("America/Chicago", 71121.0, 20000.0),
+    ("Europe/Berlin", 281021.0, 23000.0),
+    ("Australia/Adelaide", 30421.0, 23000.0),  # half hour offset
+])
+def test_local_time_matches_zoneinfo(zone, date, clock):
+    decoder = Decoder()
+    decoder.sensor_timezone = zone
+    assert decoder.packet_timestamp_ns(date, clock) == reference_seconds(date, clock, zone) * NS_PER_SECOND
+
+def scalar_measurements(decoder, payload):
+    decoded, timestamp = decoder.decode_ns(payload)
+    return timestamp, [(m["name"], np.float32(m["value"]), m.get("quality"))
+                       for m in decoded["measurements"] if m["name"] not in ("device_id", "version")]
+
+def batch_measurements(decoder, result, index):
+    rows = np.flatnonzero(result["packet"] == index)
+    names = {0: SAMPLING_PERIOD.topic, 255: HEARTBEAT.topic}
+    measurements = []
+    for row in rows:
+        code, value = int(result["code"][row]), result["value"][row]
+        if result["status"][row] != 0 or result["quality"][row] == DROP:
+            continue  # unavailable or dropped, decode_ns leaves them out
+        name = names[code] if code in names else decoder.lookup[code].topic
+        measurements.append((name, np.float32(value), QUALITY[int(result["quality"][row])]))
+    return int(result["timestamp"][rows[0]]) if len(rows) else None, measurements
+
+@pytest.mark.parametrize("range_action", ["flag", "clamp", "drop", "off"])
+def test_decode_batch_matches_decode_ns(range_action):
+    scalar, batch = Decoder(range_action=range_action), Decoder(range_action=range_action)
+    for decoder in (scalar, batch):
+        decoder.sensor_time_is_utc = True
+    bad_crc = bytearray(packet(scalar, [(1, 0, 20.0)]))
+    bad_crc[-1] ^= 0xFF
+    payloads = [
+        packet(scalar, [(1, 0, 21.5), (2, 0, 70.7)]),
+        packet(scalar, [(1, 1, 99999.0), (2, 0, 70.7)]),  # unavailable value
+        packet(scalar, [(1, 0, 9999.0), (2, 0, -80.0)]),  # outside the scale
+        packet(scalar, [(0, 900), (1, 1, 99999.0), (3, 0, 700.0)]),  # short records, decoded one by one
+        packet(scalar, [(255, 1), (1, 0, 22.0)], date=250421.0),
+        packet(scalar, [(1, 0, float("nan")), (2, 0, 70.7)]),
+        bytes(bad_crc),
+        packet(scalar, [(1, 0, 21.5), (2, 0, 70.7)], date=300221.0),  # invalid date
+    ]
+    result = batch.decode_batch(payloads)
+    assert result["invalid"].tolist() == [6, 7]
+    for index, payload in enumerate(payloads):
+        if index in (6, 7):
+            with pytest.raises(ValueError):
+                scalar.decode_ns(payload)
+            continue
+        expected = scalar_measurements(scalar, payload)
+        actual = batch_measurements(batch, result, index)
+        assert actual[0] == expected[0]
+        assert len(actual[1]) == len(expected[1])
+        for (name, value, quality), (expected_name, expected_value, expected_quality) in zip(actual[1], expected[1]):
+            assert (name, quality) == (expected_name, expected_quality)
+            assert value == expected_value or (np.isnan(value) and np.isnan(expected_value))
+    assert batch.range_counts == scalar.range_counts